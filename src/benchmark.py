@@ -0,0 +1,244 @@
+"""Times every builder and exporter against the shipped configs and compares with a baseline."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from build import SOURCE_DIRECTORY, CONFIG_SUFFIX, find_configs
+
+DEFAULT_BASELINE = os.path.join(SOURCE_DIRECTORY, '..', 'benchmark-baseline.json')
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+# slowdowns smaller than this are timer and scheduling noise, however large
+# they are relative to a case that takes a millisecond
+NOISE_SECONDS = 0.01
+
+
+def cases(config_file, directory):
+    """
+    Lists the benchmarks for one configuration file. Each case builds from
+    scratch: parts are created fresh so no stage is reused between repeats.
+
+    Args:
+        config_file (str): The configuration file to build.
+        directory (str): A scratch directory for the exports.
+
+    Returns:
+        list: (name, callable) pairs. Each callable returns a dict of
+        measurements besides time, which may be empty.
+    """
+    from external_fitting import ExternalFitting
+    from funnels import cone_funnel
+    from funnel_mesh import cone_funnel_mesh
+    from internal_funnel import InternalFunnel
+    from serialization import dumps, loads
+
+    def funnel_arguments():
+        return InternalFunnel(config_file)._funnel_dimensions
+
+    def export(part_type, file_format, **options):
+        def run():
+            part = part_type(config_file)
+            part.build()
+            file_path = os.path.join(directory, f'{part_type.__name__}.{file_format}')
+            start = time.perf_counter()
+            if file_format == 'stl':
+                measurements = {"triangles": part.export_stl(file_path, **options)}
+            else:
+                part.export_step(file_path)
+                measurements = {}
+            measurements["export_seconds"] = time.perf_counter() - start
+            # STEP files carry their export time and session ids, so only mesh sizes repeat
+            if file_format != 'step':
+                measurements["bytes"] = os.path.getsize(file_path)
+            return measurements
+        return run
+
+    def serialize(part_type):
+        def run():
+            start = time.perf_counter()
+            compound = part_type(config_file).compound
+            built = time.perf_counter()
+            data = dumps(compound)
+            dumped = time.perf_counter()
+            loads(data)
+            loaded = time.perf_counter()
+            return {"build_seconds": built - start, "dumps_seconds": dumped - built,
+                    "loads_seconds": loaded - dumped, "bytes": len(data),
+                    "speedup": (built - start)/(loaded - dumped)}
+        return run
+
+    def timed(build):
+        def run():
+            build()
+            return {}
+        return run
+
+    return [
+        ('cone_funnel', timed(lambda: cone_funnel(**funnel_arguments()))),
+        ('cone_funnel_mesh', timed(lambda: cone_funnel_mesh(**funnel_arguments()))),
+        ('hex_funnel', timed(lambda: InternalFunnel(config_file)._build_funnel(False))),
+        ('hex_funnel_mesh', timed(lambda: InternalFunnel(config_file).funnel_mesh())),
+        ('socket_base', timed(lambda: InternalFunnel(config_file).socket_base())),
+        ('bend', timed(lambda: InternalFunnel(config_file).bend())),
+        ('internal_funnel.estimate', timed(lambda: InternalFunnel(config_file).estimate())),
+        ('external_fitting.estimate', timed(lambda: ExternalFitting(config_file).estimate())),
+        ('internal_funnel.compound', timed(lambda: InternalFunnel(config_file).compound)),
+        ('external_fitting.compound', timed(lambda: ExternalFitting(config_file).compound)),
+        ('internal_funnel.export_stl', export(InternalFunnel, 'stl')),
+        ('internal_funnel.export_stl_mesh_threads',
+         export(InternalFunnel, 'stl', mesh_threads=True)),
+        ('internal_funnel.export_stl_fused', export(InternalFunnel, 'stl', fused=True)),
+        ('internal_funnel.export_step', export(InternalFunnel, 'step')),
+        ('external_fitting.export_stl', export(ExternalFitting, 'stl')),
+        ('external_fitting.export_stl_mesh_threads',
+         export(ExternalFitting, 'stl', mesh_threads=True)),
+        ('external_fitting.export_stl_fused', export(ExternalFitting, 'stl', fused=True)),
+        ('external_fitting.export_step', export(ExternalFitting, 'step')),
+        ('internal_funnel.serialize', serialize(InternalFunnel)),
+        ('external_fitting.serialize', serialize(ExternalFitting)),
+        ]
+
+
+def clear_caches():
+    """
+    Empties the in-process caches, so a repeat measures building the geometry
+    rather than finding it in a cache. The geometry cache is disabled instead
+    of emptied, as emptying it would discard the geometry other runs stored.
+    """
+    import geometry_cache
+    from labels import text_sketch
+    geometry_cache.enabled = False
+    text_sketch.cache_clear()
+
+
+def run(config_files, repeat=DEFAULT_REPEAT, selected=None):
+    """
+    Runs the benchmarks, emptying the caches before every run.
+
+    Args:
+        config_files (list): The configuration files to build.
+        repeat (int): The number of times each case is run.
+        selected (str): Only run cases whose name contains this text.
+
+    Yields:
+        tuple: The case name, as `<config>/<case>`, and its results: the median
+        seconds and the measurements of the last run, or the error if a run
+        failed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for config_file in config_files:
+            stem = os.path.basename(config_file)[:-len(CONFIG_SUFFIX)]
+            for case, benchmark in cases(config_file, directory):
+                name = f'{stem}/{case}'
+                if selected and selected not in name:
+                    continue
+                durations = []
+                try:
+                    for _ in range(repeat):
+                        clear_caches()
+                        start = time.perf_counter()
+                        measurements = benchmark()
+                        durations.append(time.perf_counter() - start)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    yield name, {"error": f'{type(error).__name__}: {error}'}
+                    continue
+                yield name, {"seconds": statistics.median(durations), **measurements}
+
+
+def compare(result, baseline, tolerance):
+    """
+    Compares a result with its baseline.
+
+    Args:
+        result (dict): The measurements of a case.
+        baseline (dict): The baseline measurements of the case, or None.
+        tolerance (float): The allowed relative increase in time.
+
+    Returns:
+        list: Descriptions of each regression; empty if there are none. A
+        case missing from the baseline is a regression, so the check can't
+        pass without comparing anything.
+    """
+    if baseline is None:
+        return ['no baseline, run with --update-baseline to record one']
+    problems = []
+    if result["seconds"] > baseline["seconds"] * (1 + tolerance) + NOISE_SECONDS:
+        problems.append(f'{result["seconds"]/baseline["seconds"]:.2f}x slower')
+    for measurement in ("triangles", "bytes"):
+        if measurement in baseline and result.get(measurement) != baseline[measurement]:
+            problems.append(f'{measurement} {baseline[measurement]} -> {result.get(measurement)}')
+    return problems
+
+
+def environment():
+    """Returns a description of the machine and libraries the benchmarks ran with."""
+    from versions import library_versions
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "processor": platform.processor(), "libraries": library_versions()}
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('config_directory', nargs='?', default=SOURCE_DIRECTORY,
+                        help='directory containing the *-settings.ini files')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'runs per case, the median is reported (default: {DEFAULT_REPEAT})')
+    parser.add_argument('-k', dest='selected',
+                        help='only run cases whose name contains this text')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='baseline JSON file to compare with')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed relative slowdown before a case fails '
+                             f'(default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write the results to the baseline file instead of comparing; '
+                             'with -k, only the selected cases are replaced')
+    args = parser.parse_args()
+
+    baseline = {"environment": None, "results": {}}
+    if not args.update_baseline:
+        if not os.path.exists(args.baseline):
+            parser.exit(2, f'error: no baseline at {args.baseline}, '
+                           'run with --update-baseline to record one\n')
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["environment"] != environment():
+            print('warning: the baseline was recorded on a different machine or library versions')
+
+    results = {}
+    failed = False
+    for name, result in run(find_configs(args.config_directory), args.repeat, args.selected):
+        if "error" in result:
+            print(f'{name}: FAILED: {result["error"]}')
+            failed = True
+            continue
+        results[name] = result
+        if args.update_baseline:
+            problems = []
+        else:
+            problems = compare(result, baseline["results"].get(name), args.tolerance)
+        details = ''.join(f' {key}={value}' for key, value in result.items()
+                          if key != 'seconds')
+        status = 'REGRESSION: ' + ', '.join(problems) if problems else 'ok'
+        print(f'{name}: {result["seconds"]:.3f}s{details} {status}')
+        failed = failed or bool(problems)
+
+    if args.update_baseline:
+        recorded = {}
+        if args.selected and os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as baseline_file:
+                recorded = json.load(baseline_file)["results"]
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({"environment": environment(), "results": {**recorded, **results}},
+                      baseline_file, indent=2, sort_keys=True)
+        print(f'wrote {len(results)} results to {args.baseline}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
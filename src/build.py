@@ -1,24 +1,462 @@
 "loads configs, generates objects, and creates stl exports"
-from external_fitting import ExternalFitting
-from internal_funnel import InternalFunnel
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from glob import glob
+from typing import NamedTuple
+from manifest import Manifest, input_digest
+from parameters import Parameters, PARAMETER_FIELDS
+from part_stages import EXTERNAL_FITTING_STAGES, PART_STAGES
+from validation import check
 
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIRECTORY = os.path.join(SOURCE_DIRECTORY, '..', 'stl')
+CONFIG_SUFFIX = '-settings.ini'
 
-external_fitting = ExternalFitting('2.5mmIDx4mmOD-settings.ini')
-external_fitting.show()
-external_fitting.export_stl('../stl/4mmOD-external-fitting.stl')
+EXTERNAL_FITTING = 'external-fitting'
+INTERNAL_FUNNEL = 'internal-funnel'
 
-external_fitting = ExternalFitting('3mmIDx6mmOD-settings.ini')
-external_fitting.show()
-external_fitting.export_stl('../stl/6mmOD-external-fitting.stl')
 
-internal_funnel = InternalFunnel('2mmIDx4mmOD-settings.ini')
-internal_funnel.show()
-internal_funnel.export_stl('../stl/2mmIDx4mmOD-internal-funnel.stl')
+class Variant(NamedTuple):
+    """
+    A single part to build from a configuration file, or from parameters
+    applied before the configuration file when parameters is set.
+    """
+    part: str
+    config_file: str
+    name: str
+    parameters: Parameters = None
 
-internal_funnel = InternalFunnel('2.5mmIDx4mmOD-settings.ini')
-internal_funnel.show()
-internal_funnel.export_stl('../stl/2.5mmIDx4mmOD-internal-funnel.stl')
 
-internal_funnel = InternalFunnel('3mmIDx6mmOD-settings.ini')
-internal_funnel.show()
-internal_funnel.export_stl('../stl/3mmIDx6mmOD-internal-funnel.stl')
+def find_configs(directory):
+    """
+    Finds the settings files in a directory.
+
+    Args:
+        directory (str): The directory to search.
+
+    Returns:
+        list: The sorted paths of every `*-settings.ini` file.
+    """
+    return sorted(glob(os.path.join(directory, f'*{CONFIG_SUFFIX}')))
+
+
+def _fitting_inputs(parameters):
+    """Returns the values of the parameters an external fitting reads."""
+    inputs = EXTERNAL_FITTING_STAGES.inputs("compound")
+    return tuple(getattr(parameters, name) for name in PARAMETER_FIELDS
+                 if Parameters.key(name) in inputs)
+
+
+def find_variants(config_files):
+    """
+    Lists every part variant described by the given configuration files.
+    Every file produces an internal funnel. Files that only differ in
+    parameters the external fitting doesn't read share one fitting, named
+    after the tube's outer diameter; if fittings with the same outer
+    diameter differ, each is also named after the first file it came from.
+
+    Args:
+        config_files (list): Paths of the configuration files.
+
+    Returns:
+        list: The variants to build.
+    """
+    variants = []
+    fittings = {}
+    for config_file in config_files:
+        stem = os.path.basename(config_file)[:-len(CONFIG_SUFFIX)]
+        parameters = Parameters.from_file(config_file)
+        fittings.setdefault(_fitting_inputs(parameters),
+                            (config_file, stem, f'{parameters.tube_outer_diameter:g}mmOD'))
+        variants.append(Variant(INTERNAL_FUNNEL, config_file, f'{stem}-{INTERNAL_FUNNEL}'))
+    diameters = [diameter for _, _, diameter in fittings.values()]
+    for config_file, stem, diameter in fittings.values():
+        name = diameter if diameters.count(diameter) == 1 else f'{diameter}-{stem}'
+        variants.append(Variant(EXTERNAL_FITTING, config_file, f'{name}-{EXTERNAL_FITTING}'))
+    return variants
+
+
+def variant_parameters(variant):
+    """
+    Resolves the parameters a variant is built from.
+
+    Args:
+        variant (Variant): The variant.
+
+    Returns:
+        Parameters: Its parameters, with the configuration file applied.
+    """
+    if variant.config_file is None:
+        return variant.parameters
+    return Parameters.from_file(variant.config_file, base=variant.parameters)
+
+
+def output_inputs(variant, output_directory, formats, options):
+    """
+    Lists the exports of a variant with the digest of their inputs.
+
+    Args:
+        variant (Variant): The variant.
+        output_directory (str): The directory the exports are written to.
+        formats (tuple): Any of 'stl', '3mf' and 'step'.
+        options (dict): The export settings that change the output.
+
+    Returns:
+        list: (file path, input digest) for each format.
+    """
+    parameters = variant_parameters(variant)
+    return [(os.path.join(output_directory, f'{variant.name}.{file_format}'),
+             input_digest(variant.part, parameters, file_format, options))
+            for file_format in formats]
+
+
+def part_class(part):
+    """
+    Returns the class used to build a part. The CAD modules are imported
+    here so that only the processes doing the work pay for loading them.
+
+    Args:
+        part (str): EXTERNAL_FITTING or INTERNAL_FUNNEL.
+    """
+    if part == EXTERNAL_FITTING:
+        from external_fitting import ExternalFitting
+        return ExternalFitting
+    if part == INTERNAL_FUNNEL:
+        from internal_funnel import InternalFunnel
+        return InternalFunnel
+    raise ValueError(f"unknown part '{part}'")
+
+
+def split_invalid(variants):
+    """
+    Separates the variants whose parameters describe geometry that can't be
+    built, so no worker time is spent on them.
+
+    Args:
+        variants (list): The variants to check.
+
+    Returns:
+        tuple: The list of valid variants, and (variant, violations) for each
+        invalid one.
+    """
+    valid = []
+    invalid = []
+    for variant in variants:
+        violations = check(variant_parameters(variant), PART_STAGES[variant.part].stages)
+        if violations:
+            invalid.append((variant, violations))
+        else:
+            valid.append(variant)
+    return valid, invalid
+
+
+def report_invalid(invalid):
+    """
+    Prints the broken constraints of invalid variants.
+
+    Args:
+        invalid (list): (variant, violations) pairs, see split_invalid().
+    """
+    for variant, violations in invalid:
+        for violation in violations:
+            print(f'{variant.name}: skipped, {violation.message} [{", ".join(violation.keys)}]')
+
+
+def build_variant(variant, output_directory, formats=('stl',), preview=False, adaptive=False,
+                  trace_directory=None, mesh_threads=False, fused=False):
+    """
+    Builds a single variant and exports it in each requested format.
+
+    Args:
+        variant (Variant): The variant to build.
+        output_directory (str): The directory the exports are written to.
+        formats (tuple): Any of 'stl', '3mf' and 'step'.
+        preview (bool): Also send the part to the OCP CAD Viewer.
+        adaptive (bool): Mesh STL and 3MF exports with per-feature tolerances.
+        trace_directory (str): If set, time each build stage and write a
+            Chrome trace, `<name>.trace.json`, to this directory.
+        mesh_threads (bool): Generate the threads of STL exports directly
+            from their profile instead of tessellating their B-rep.
+        fused (bool): Export each part as one solid, with its threads fused
+            into the body.
+
+    Returns:
+        tuple: The variant, the list of written files, the wall time in seconds
+        and the number of mesh triangles of each file, None for STEP files.
+    """
+    if trace_directory is None:
+        return _build_variant(variant, output_directory, formats, preview, adaptive,
+                              mesh_threads, fused)
+    from profiling import tracing
+    with tracing(variant.name) as tracer:
+        result = _build_variant(variant, output_directory, formats, preview, adaptive,
+                                mesh_threads, fused)
+    os.makedirs(trace_directory, exist_ok=True)
+    tracer.write(os.path.join(trace_directory, f'{variant.name}.trace.json'))
+    return result
+
+
+def _build_variant(variant, output_directory, formats, preview, adaptive, mesh_threads, fused):
+    """Builds and exports a single variant, see build_variant()."""
+    start = time.perf_counter()
+    part = part_class(variant.part)(variant.config_file, parameters=variant.parameters)
+    if preview:
+        part.show()
+    outputs, triangles = export_part(part, variant.name, output_directory, formats, adaptive,
+                                     mesh_threads, fused)
+    return variant, outputs, time.perf_counter() - start, triangles
+
+
+def export_part(part, name, output_directory, formats=('stl',), adaptive=False,
+                mesh_threads=False, fused=False):
+    """
+    Exports a part in each requested format.
+
+    Args:
+        part (ParametricPart): The part to export.
+        name (str): The file name of the exports, without the extension.
+        output_directory (str): The directory the exports are written to.
+        formats (tuple): Any of 'stl', '3mf' and 'step'.
+        adaptive (bool): Mesh STL and 3MF exports with per-feature tolerances.
+        mesh_threads (bool): Generate the threads of STL exports from their profile.
+        fused (bool): Export the part as one solid, with its threads fused into the body.
+
+    Returns:
+        tuple: The list of written files and the number of mesh triangles of
+        each, None for STEP files.
+    """
+    from profiling import span
+    outputs = []
+    triangles = []
+    for file_format in formats:
+        file_path = os.path.join(output_directory, f'{name}.{file_format}')
+        with span(f'export {file_format}', 'export'):
+            if file_format == 'stl':
+                triangles.append(part.export_stl(file_path, adaptive=adaptive,
+                                                 mesh_threads=mesh_threads, fused=fused))
+            elif file_format == '3mf':
+                triangles.append(part.export_3mf(file_path, adaptive=adaptive, fused=fused))
+            else:
+                part.export_step(file_path, fused=fused)
+                triangles.append(None)
+        outputs.append(file_path)
+    return outputs, triangles
+
+
+def build_all(variants, output_directory, formats=('stl',), jobs=None, preview=False,
+              adaptive=False, trace_directory=None, mesh_threads=False, fused=False):
+    """
+    Builds variants in a process pool, one worker per core by default.
+
+    Args:
+        variants (list): The variants to build.
+        output_directory (str): The directory the exports are written to.
+        formats (tuple): Any of 'stl', '3mf' and 'step'.
+        jobs (int): The number of worker processes; 1 builds in this process.
+        preview (bool): Also send each part to the OCP CAD Viewer.
+        adaptive (bool): Mesh STL and 3MF exports with per-feature tolerances.
+        trace_directory (str): If set, write a Chrome trace for each variant here.
+        mesh_threads (bool): Generate the threads of STL exports from their profile.
+        fused (bool): Export each part as one solid, with its threads fused into the body.
+
+    Yields:
+        tuple: The result of build_variant() for each variant, as it finishes.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for variant in variants:
+            yield build_variant(variant, output_directory, formats, preview, adaptive,
+                                trace_directory, mesh_threads, fused)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(variants) or 1)) as pool:
+        futures = [pool.submit(build_variant, variant, output_directory, formats, preview,
+                               adaptive, trace_directory, mesh_threads, fused)
+                   for variant in variants]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def build_objects(variant, fused=False, mesh_threads=False):
+    """
+    Builds the objects of a variant, the first step of a pipelined build.
+
+    Args:
+        variant (Variant): The variant to build.
+        fused (bool): Build the part fused into one solid.
+        mesh_threads (bool): Leave out the threads, which every export will
+            generate from their profile.
+
+    Returns:
+        tuple: The variant, the serialized BREP of its objects, see
+        ParametricPart.dump_objects(), and the build time in seconds.
+    """
+    start = time.perf_counter()
+    part = part_class(variant.part)(variant.config_file, parameters=variant.parameters)
+    part.validate()
+    return variant, part.dump_objects(fused, mesh_threads), time.perf_counter() - start
+
+
+def export_objects(variant, objects, output_directory, formats=('stl',), adaptive=False,
+                   mesh_threads=False, fused=False):
+    """
+    Exports the objects built by build_objects(), the second step of a
+    pipelined build.
+
+    Args:
+        variant (Variant): The variant.
+        objects (dict): The serialized objects of the variant.
+        output_directory (str): The directory the exports are written to.
+        formats (tuple): Any of 'stl', '3mf' and 'step'.
+        adaptive (bool): Mesh STL and 3MF exports with per-feature tolerances.
+        mesh_threads (bool): Generate the threads of STL exports from their profile.
+        fused (bool): Export the part fused into one solid.
+
+    Returns:
+        tuple: The list of written files, the number of mesh triangles of each
+        and the export time in seconds.
+    """
+    start = time.perf_counter()
+    part = part_class(variant.part)(variant.config_file, parameters=variant.parameters)
+    part.load_objects(objects)
+    outputs, triangles = export_part(part, variant.name, output_directory, formats, adaptive,
+                                     mesh_threads, fused)
+    return outputs, triangles, time.perf_counter() - start
+
+
+def build_pipelined(variants, output_directory, formats=('stl',), jobs=None, adaptive=False,
+                    mesh_threads=False, queue_size=None, fused=False):
+    """
+    Builds variants with geometry construction and export overlapped: one pool
+    of workers builds the B-reps and hands them, serialized, to another pool
+    that tessellates and writes them, so a batch takes about as long as the
+    slower of the two steps instead of both.
+
+    Args:
+        variants (list): The variants to build.
+        output_directory (str): The directory the exports are written to.
+        formats (tuple): Any of 'stl', '3mf' and 'step'.
+        jobs (int): The total number of worker processes, split between the
+            two pools; one per core by default. 1 builds and exports each
+            variant in turn in this process.
+        adaptive (bool): Mesh STL and 3MF exports with per-feature tolerances.
+        mesh_threads (bool): Generate the threads of STL exports from their profile.
+        queue_size (int): The most built variants held waiting for export,
+            twice the number of export workers by default.
+        fused (bool): Export each part as one solid, fused by the build workers.
+
+    Yields:
+        tuple: The variant, the list of written files, the build and export
+        time in seconds and the number of mesh triangles of each file, as each
+        finishes.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        yield from build_all(variants, output_directory, formats, 1, adaptive=adaptive,
+                             mesh_threads=mesh_threads, fused=fused)
+        return
+    os.makedirs(output_directory, exist_ok=True)
+    # the B-rep threads are only needed by exports that can't use thread meshes
+    skip_threads = mesh_threads and all(file_format == 'stl' for file_format in formats)
+    build_jobs = jobs // 2
+    export_jobs = jobs - build_jobs
+    queue_size = queue_size or 2 * export_jobs
+    pending = list(reversed(variants))
+    building = {}
+    exporting = {}
+    with ProcessPoolExecutor(max_workers=build_jobs) as builders, \
+            ProcessPoolExecutor(max_workers=export_jobs) as exporters:
+        while pending or building or exporting:
+            # only start builds while there's room in the queue for their results
+            while pending and len(building) < build_jobs and \
+                    len(building) + len(exporting) < build_jobs + queue_size:
+                building[builders.submit(build_objects, pending.pop(), fused,
+                                         skip_threads)] = None
+            done, _ = wait(list(building) + list(exporting), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in building:
+                    del building[future]
+                    variant, objects, seconds = future.result()
+                    exporting[exporters.submit(export_objects, variant, objects,
+                                               output_directory, formats, adaptive,
+                                               mesh_threads, fused)] = (variant, seconds)
+                else:
+                    variant, seconds = exporting.pop(future)
+                    outputs, triangles, export_seconds = future.result()
+                    yield variant, outputs, seconds + export_seconds, triangles
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('config_directory', nargs='?', default=SOURCE_DIRECTORY,
+                        help='directory containing the *-settings.ini files')
+    parser.add_argument('-o', '--output-directory', default=DEFAULT_OUTPUT_DIRECTORY)
+    parser.add_argument('-f', '--format', dest='formats', action='append',
+                        choices=('stl', '3mf', 'step'),
+                        help='export format, may be repeated (default: stl)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--show', action='store_true',
+                        help='preview each part in the OCP CAD Viewer')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='mesh STL and 3MF exports with per-feature tolerances')
+    parser.add_argument('--trace', metavar='DIRECTORY', dest='trace_directory',
+                        help='write a Chrome trace of the build stages of each variant '
+                             'to this directory')
+    parser.add_argument('--mesh-threads', action='store_true',
+                        help='generate STL thread triangles directly from the thread profile')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every variant, even if its exports are up to date')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='overlap building the next variants with exporting the last, '
+                             'in separate worker pools')
+    parser.add_argument('--fused', action='store_true',
+                        help='export each part as one solid, with its threads fused into the body')
+    args = parser.parse_args()
+    if args.fused and args.mesh_threads:
+        parser.error("--mesh-threads meshes can't be fused, choose one")
+    if args.pipeline and (args.show or args.trace_directory):
+        parser.error('--pipeline builds and exports in different processes, so it '
+                     "can't be combined with --show or --trace")
+
+    start = time.perf_counter()
+    formats = tuple(args.formats or ('stl',))
+    options = {'adaptive': args.adaptive, 'mesh_threads': args.mesh_threads}
+    if args.fused:
+        options['fused'] = True
+    manifest = Manifest.load(args.output_directory)
+    variants = []
+    inputs = {}
+    found, invalid = split_invalid(find_variants(find_configs(args.config_directory)))
+    report_invalid(invalid)
+    for variant in found:
+        inputs[variant.name] = output_inputs(variant, args.output_directory, formats, options)
+        if args.force or not all(manifest.is_current(*output)
+                                 for output in inputs[variant.name]):
+            variants.append(variant)
+        else:
+            print(f'{variant.name}: up to date')
+    if args.pipeline:
+        results = build_pipelined(variants, args.output_directory, formats, args.jobs,
+                                  args.adaptive, args.mesh_threads, fused=args.fused)
+    else:
+        results = build_all(variants, args.output_directory, formats, args.jobs, args.show,
+                            args.adaptive, args.trace_directory, args.mesh_threads,
+                            args.fused)
+    for variant, outputs, duration, triangles in results:
+        meshes = [f'{count} {file_format}' for count, file_format in zip(triangles, formats)
+                  if count is not None]
+        mesh = f' ({", ".join(meshes)} triangles)' if meshes else ''
+        print(f'{variant.name}: {duration:.1f}s{mesh} -> {", ".join(outputs)}')
+        parameters = variant_parameters(variant)
+        for (file_path, digest), count in zip(inputs[variant.name], triangles):
+            manifest.record(file_path, digest, parameters, count, duration)
+        manifest.save()
+    print(f'built {len(variants)} variants in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
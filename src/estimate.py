@@ -0,0 +1,127 @@
+"""Module providing closed-form estimates of the filament and print time of the parts."""
+from math import sqrt, pi, tan, radians
+from typing import NamedTuple
+from thread_mesh import DEFAULT_END_FINISHES, FADE_ANGLE, thread_profile
+
+
+class PrintSettings(NamedTuple):
+    """The slicer settings the print time and mass estimates assume."""
+    layer_height: float = 0.15
+    line_width: float = 0.4
+    perimeters: int = 3
+    infill: float = 0.2
+    speed: float = 60.0
+    layer_time: float = 1.0
+    density: float = 1.24
+
+
+class Component(NamedTuple):
+    """The volume (mm^3) of an object of a part and the typical thickness (mm) of its walls."""
+    volume: float
+    wall: float
+
+
+class Estimate(NamedTuple):
+    """The filament and time needed to print a part."""
+    volume: float
+    filament: float
+    mass: float
+    print_time: float
+
+
+def hexagon_area(radius):
+    """Returns the area of a regular hexagon with its vertices at radius."""
+    return 3*sqrt(3)/2*radius**2
+
+
+def rounded_hexagon_area(radius, fillet_radius):
+    """Returns the area of a regular hexagon, vertices at radius, with filleted corners."""
+    return hexagon_area(radius) - fillet_radius**2*(2*sqrt(3) - pi)
+
+
+def circle_area(radius):
+    """Returns the area of a circle."""
+    return pi*radius**2
+
+
+def frustum_volume(lower_area, upper_area, height):
+    """Returns the volume of a frustum between two similar sections."""
+    return height*(lower_area + sqrt(lower_area*upper_area) + upper_area)/3
+
+
+def cone_frustum_volume(lower_radius, upper_radius, height):
+    """Returns the volume of a frustum of a cone."""
+    return pi*height*(lower_radius**2 + lower_radius*upper_radius + upper_radius**2)/3
+
+
+def countersink_volume(radius, countersink_radius, angle=82):
+    """Returns the volume a countersink removes beyond its hole."""
+    depth = (countersink_radius - radius)/tan(radians(angle/2))
+    return cone_frustum_volume(radius, countersink_radius, depth) - circle_area(radius)*depth
+
+
+def chamfer_volume(radius, length):
+    """Returns the volume a 45 degree chamfer removes from the outer edge of a cylinder."""
+    return 2*pi*(radius - length/3)*length**2/2
+
+
+def thread_volume(spec):
+    """
+    Returns the volume of a thread: the area of its tooth, including the
+    interference, swept along its helix at the tooth's mean radius. The end
+    finishes follow thread_mesh: square and raw ends keep the whole profile up
+    to the end, a chamfer loses about half the tooth within a tooth's depth of
+    the end, and a fade starts half a root width inside the end and shrinks the
+    tooth to nothing over a quarter turn.
+    """
+    core_radius, root_radius, apex_radius, root_width, apex_width = thread_profile(spec)
+    height = abs(apex_radius - root_radius)
+    core_area = abs(root_radius - core_radius)*root_width
+    tooth_area = height*(root_width + apex_width)/2
+    # the tooth's area averaged over a fade, as its height and width shrink linearly
+    faded_area = height*(root_width/2 + (apex_width - root_width)/6)
+    fade_length = spec.pitch*FADE_ANGLE/(2*pi)
+    core_length = tooth_length = spec.length
+    for finish in spec.end_finishes or DEFAULT_END_FINISHES:
+        if finish == "fade":
+            core_length -= root_width/2
+            tooth_length -= root_width/2 + fade_length*(1 - faded_area/tooth_area)
+        elif finish == "chamfer":
+            tooth_length -= height/2
+    mean_radius = (core_radius + apex_radius)/2
+    return (core_area*core_length + tooth_area*tooth_length)*2*pi*mean_radius/spec.pitch
+
+
+def combine(*components):
+    """Returns a Component for several pieces printed as one object."""
+    volume = sum(component.volume for component in components)
+    wall = sum(component.volume*component.wall for component in components)/volume
+    return Component(volume, wall)
+
+
+def print_estimate(components, height, settings=PrintSettings()):
+    """
+    Estimates the filament and print time of a part. Walls are printed solid up
+    to the thickness of the perimeters on each side and the rest at the infill
+    density; the time is the extruded volume at the volumetric flow of the
+    settings plus a fixed time per layer.
+
+        Parameters:
+            components (dict): The Component of each object of the part
+            height (float): The printed height of the part
+            settings (PrintSettings): The slicer settings
+
+        Returns:
+            estimate (Estimate): The volume of the part in mm^3, the filament
+                extruded in mm^3, its mass in g and the print time in s
+    """
+    shell = 2*settings.perimeters*settings.line_width
+    volume = filament = 0
+    for component in components.values():
+        solid = min(1, shell/component.wall) if component.wall > 0 else 1
+        volume += component.volume
+        filament += component.volume*(solid + settings.infill*(1 - solid))
+    flow = settings.line_width*settings.layer_height*settings.speed
+    layers = height/settings.layer_height
+    return Estimate(volume, filament, filament*settings.density/1000,
+                    filament/flow + layers*settings.layer_time)
@@ -1,446 +1,139 @@
 """Module providing parts for a repbox filament funnel and external fitting."""
-from math import floor
-from configparser import ConfigParser
-from bd_warehouse.thread import TrapezoidalThread
+from math import floor, sqrt
 from build123d import (BuildPart, BuildSketch,
                        Circle, RegularPolygon,
-                       extrude, chamfer, Text, Compound,
-                       Mode, Location, Locations, CounterSinkHole,
-                       Align, GeomType, SortBy, Axis, export_step, export_stl)
-from ocp_vscode import show
+                       extrude, chamfer, add,
+                       Mode, Locations, CounterSinkHole,
+                       GeomType, SortBy, Axis)
+from estimate import (Component, chamfer_volume, circle_area, combine, countersink_volume,
+                      hexagon_area)
+from threads import ThreadSpec
+from labels import text_sketch
+from parametric_part import ParametricPart
+from profiling import span
+from part_stages import EXTERNAL_FITTING_STAGES
 
 REVISION_TEXT = "R1.0"
 
-"""
 
-"""
-class ExternalFitting:
-    def __init__(self, config_file):
-        """
-        Initialize the InternalFitting by loading a configuration file.
-
-        Args:
-            config_file (str): Path to the configuration file.
-        """
-        self.config = ConfigParser()
-        self.load_config(config_file)
-
-    def load_config(self, config_file):
-        """
-        Update config values by loading a configuration file.
-
-        Args:
-            config_file (str): Path to the configuration file.
-        """
-        self.config.read(config_file)
-
-    @property
-    def connector_depth(self):
-        """
-        Get the depth of the connector.
-
-        Returns:
-            float: The depth of the connector.
-        """
-        return self.config.getfloat('connector', 'depth', fallback=6.5)
-
-    @connector_depth.setter
-    def connector_depth(self, value):
-        """
-        Set the depth of the connector.
-
-        Args:
-            float: The depth of the connector.
-        """
-        self.config.set('connector', 'depth', str(value))
-
-    @property
-    def connector_diameter(self):
-        """
-        Get the diameter of the connector.
-
-        Returns:
-            float: The diameter of the connector.
-        """
-        return self.config.getfloat('connector', 'diameter', fallback=10.1)
-
-    @connector_diameter.setter
-    def connector_diameter(self, value):
-        """
-        Set the diameter of the connector.
-
-        Args:
-            float: The diameter of the connector.
-        """
-        self.config.set('connector', 'diameter', str(value))
-
-    @property
-    def connector_pitch(self):
-        """
-        Get the pitch of the connector.
-
-        Returns:
-            float: The pitch of the connector.
-        """
-        return self.config.getfloat('connector', 'pitch', fallback=0.874)
-
-    @connector_pitch.setter
-    def connector_pitch(self, value):
-        """
-        Set the pitch of the connector.
-
-        Args:
-            float: The pitch of the connector.
-        """
-        self.config.set('connector', 'pitch', str(value))
-
-    @property
-    def shaft_length(self):
-        """
-        Get the shaft length.
-
-        Returns:
-            float: The length of the shaft.
-        """
-        return self.config.getfloat('shaft', 'length', fallback=20)
-
-    @shaft_length.setter
-    def shaft_length(self, value):
-        """
-        Set the shaft length.
-
-        Args:
-            float: The length of the shaft.
-        """
-        self.config.set('shaft', 'length', str(value))
-
-    @property
-    def shaft_diameter(self):
-        """
-        Get the shaft diameter.
-
-        Returns:
-            float: The diameter of the shaft.
-        """
-        return self.config.getfloat('shaft', 'diameter', fallback=11.5)
-
-    @shaft_diameter.setter
-    def shaft_diameter(self, value):
-        """
-        Set the shaft diameter.
-
-        Args:
-            float: The diameter of the shaft.
-        """
-        self.config.set('shaft', 'diameter', str(value))
-
-    @property
-    def shaft_interference(self):
-        """
-        Get the shaft thread interference.
-
-        Returns:
-            float: The interference of the shaft thread.
-        """
-        return self.config.getfloat('shaft', 'interference', fallback=0.5)
-
-    @shaft_interference.setter
-    def shaft_interference(self, value):
-        """
-        Set the shaft thread interference. This is the
-        amount the thread will overlap with the shaft. 
-        Ajust if the threads don't seem properly fused 
-        to the shaft. 
-
-        Args:
-            float: The interference of the shaft thread.
-        """
-        self.config.set('shaft', 'interference', str(value))
-
-    @property
-    def fitting_diameter(self):
-        """
-        Get the diameter of the fitting.
-
-        Returns:
-            float: The diameter of the fitting.
-        """
-        return self.config.getfloat('fitting', 'diameter', fallback=17.5)
-
-    @fitting_diameter.setter
-    def fitting_diameter(self, value):
-        """
-        Set the diameter of the fitting.
-
-        Args:
-            float: The diameter of the fitting.
-        """
-        self.config.set('fitting', 'diameter', str(value))
-
-    @property
-    def fitting_depth(self):
-        """
-        Get the depth of the fitting.
-
-        Returns:
-            float: The depth of the fitting.
-        """
-        return self.config.getfloat('fitting', 'depth', fallback=4.5)
-
-    @fitting_depth.setter
-    def fitting_depth(self, value):
-        """
-        Set the depth of the fitting.
-
-        Args:
-            float: The depth of the fitting.
-        """
-        self.config.set('fitting', 'depth', str(value))
-
-    @property
-    def fitting_pitch(self):
-        """
-        Get the pitch of the fitting threads.
-
-        Returns:
-            float: The pitch of the fitting threads.
-        """
-        return self.config.getfloat('fitting', 'pitch', fallback=1.25)
-
-    @fitting_pitch.setter
-    def fitting_pitch(self, value):
-        """
-        Set the pitch of the fitting threads.
-
-        Args:
-            float: The pitch of the fitting threads.
-        """
-        self.config.set('fitting', 'pitch', str(value))
+class ExternalFitting(ParametricPart):
+    """The fitting screwed onto the RepBox connector, with a threaded shaft for the funnel."""
+    STAGES = EXTERNAL_FITTING_STAGES
+    LABEL = "External Fitting"
+    OBJECTS = {"Outer Fitting": "outer_fitting",
+               "connector thread": "connector_thread",
+               "shaft thread": "shaft_thread"}
+    CACHED_STAGES = ("connector_thread", "shaft_thread")
+    THREAD_LABELS = ("connector thread", "shaft thread")
 
     @property
-    def fitting_tolerance(self):
-        """
-        Get the tolerance of the fitting threads.
-
-        Returns:
-            float: The tolerance of the fitting threads.
-        """
-        return self.config.getfloat('fitting', 'tolerance', fallback=0.5)
-
-    @fitting_tolerance.setter
-    def fitting_tolerance(self, value):
-        """
-        Set the tolerance of the fitting threads.
-
-        Args:
-            float: The tolerance of the fitting threads.
-        """
-        self.config.set('fitting', 'tolerance', str(value))
-
-    @property
-    def hex_diameter(self):
-        """
-        Get the diameter of the external hexagon.
-
-        Returns:
-            float: The diameter of the external hexagon.
-        """
-        return self.config.getfloat('fitting', 'hex_diameter', fallback=21)
-
-    @hex_diameter.setter
-    def hex_diameter(self, value):
-        """
-        Set the diameter of the external hexagon.
-
-        Args:
-            float: The diameter of the external hexagon.
-        """
-        self.config.set('fitting', 'hex_diameter', str(value))
-
-    @property
-    def hex_depth(self):
-        """
-        Get the depth of the external hexagon.
-
-        Returns:
-            float: The depth of the external hexagon.
-        """
-        return self.config.getfloat('fitting', 'hex_depth', fallback=5)
-
-    @hex_depth.setter
-    def hex_depth(self, value):
-        """
-        Set the depth of the external hexagon.
-
-        Args:
-            float: The depth of the external hexagon.
-        """
-        self.config.set('fitting', 'hex_depth', str(value))
-
-    @property
-    def tube_outer_diameter(self):
-        """
-        Get the diameter of the PTFE tube path. Note: this is the
-        value as printed but tolerance is added in the calculated
-        size of the tube path.
-
-        Returns:
-            float: The diameter of the PTFE tube path.
-        """
-        return self.config.getfloat('tube', 'outer_diameter', fallback=6)
-
-    @tube_outer_diameter.setter
-    def tube_outer_diameter(self, value):
-        """
-        Set the diameter of the PTFE tube path. Note: this is the
-        value as printed but tolerance is added in the calculated
-        size of the tube path.
-
-        Args:
-            float: The diameter of the PTFE tube path.
-        """
-        self.config.set('tube', 'outer_diameter', str(value))
+    def _chamfer_radius(self):
+        """The chamfer at the top of the shaft."""
+        p = self.parameters
+        return (p.shaft_diameter-
+                (p.tube_outer_diameter+p.tube_outer_tolerance))/8
 
     @property
-    def tube_outer_tolerance(self):
-        """
-        Get the tolerance of the PTFE tube path. This value is 
-        added to the diameter in the calculated size of the 
-        tube path.
-
-        Returns:
-            float: The tolerance for the PTFE tube path.
-        """
-        return self.config.getfloat('tube', 'outer_tolerance', fallback=0.5)
-
-    @tube_outer_tolerance.setter
-    def tube_outer_tolerance(self, value):
-        """
-        Set the tolerance of the PTFE tube path. This value is 
-        added to the diameter in the calculated size of the 
-        tube path.
-
-        Args:
-            float: The tolerance for the PTFE tube path.
-        """
-        self.config.set('tube', 'outer_tolerance', str(value))
+    def _connector_thread_spec(self):
+        """The thread of the connector nut."""
+        p = self.parameters
+        return ThreadSpec(
+            diameter=p.connector_diameter,
+            pitch=p.connector_pitch,
+            length=p.connector_depth-p.connector_pitch/2,
+            external=False,
+            )
 
     @property
-    def font_path(self):
-        """
-        Get the path of the configured font used for embossing labels.
-
-        Returns:
-            string: The path of the configured font used for embossing labels.
-        """
-        return self.config.get('general', 'font-path', fallback='C:\\Windows\\Fonts\\arial.ttf')
-
-    @font_path.setter
-    def font_path(self, value):
-        """
-        Sets the path of the configured font to the value provided. If the
-        path is invalid, Arial will be used instead.
+    def _shaft_thread_spec(self):
+        """The thread of the shaft."""
+        p = self.parameters
+        return ThreadSpec(
+            diameter=p.shaft_diameter,
+            pitch=p.fitting_pitch,
+            length=p.shaft_length-p.fitting_depth-self._chamfer_radius,
+            external=True,
+            interference=p.shaft_interference,
+            end_finishes=("square","chamfer"),
+            )
 
-        Args:
-            string: A path to a valid font.
-        """
-        self.config.set('general', 'font-path', value)
+    def _thread_placements(self):
+        """Returns the connector thread and shaft thread and their heights."""
+        p = self.parameters
+        return {"connector thread": (self._connector_thread_spec, p.connector_pitch/2),
+                "shaft thread": (self._shaft_thread_spec, p.connector_depth+p.fitting_depth)}
 
-    @property
-    def compound(self) -> Compound:
-        """Returns a Compound for the complete external fitting."""
-        chamfer_radius = (self.shaft_diameter-
-                          (self.tube_outer_diameter+self.tube_outer_tolerance))/8
-        fitting_nut_thread =  TrapezoidalThread(
-            diameter=self.connector_diameter,
-            pitch=self.connector_pitch,
-            length=self.connector_depth-self.connector_pitch/2,
-            thread_angle = 30.0,
-            external=False,
-            hand="right",
-            align=Align.CENTER,
-            ).moved(Location((0,0,self.connector_pitch/2)))
+    def _build_connector_thread(self, draft):
+        """Builds the thread of the connector nut."""
+        return self._build_placed_thread("connector thread", draft)
 
-        shaft_thread =  TrapezoidalThread(
-            diameter=self.shaft_diameter,
-            pitch=self.fitting_pitch,
-            length=self.shaft_length-self.fitting_depth-chamfer_radius,
-            thread_angle = 30.0,
-            external=True,
-            interference=self.shaft_interference,
-            end_finishes=("square","chamfer"),
-            hand="right",
-            align=Align.CENTER,
-            ).moved(Location((0,0,self.connector_depth+self.fitting_depth)))
+    def _build_shaft_thread(self, draft):
+        """Builds the thread of the shaft."""
+        return self._build_placed_thread("shaft thread", draft)
 
+    def _build_outer_fitting(self, draft):
+        """Builds the hexagonal nut and shaft of the fitting."""
+        p = self.parameters
         with BuildPart() as outer_fitting:
             with BuildSketch():
-                RegularPolygon(radius=self.fitting_diameter/2, side_count=6)
-            extrude(amount=self.connector_depth)
-            with BuildSketch(outer_fitting.faces().sort_by(Axis.Y)[0]):
-                Text(
-                    REVISION_TEXT,
-                    font_path=self.font_path,
-                    font_size=3,
-                    align=(Align.CENTER, Align.CENTER)
-                    )
-            extrude(amount=-.4, mode=Mode.SUBTRACT)
-            with BuildSketch(outer_fitting.faces().sort_by(Axis.Y)[-1]):
-                Text(
-                    f"OD\n{floor(self.tube_outer_diameter)}mm",
-                    font_path=self.font_path,
-                    font_size=2,
-                    align=(Align.CENTER, Align.CENTER)
-                    )
-            extrude(amount=-.4, mode=Mode.SUBTRACT)
+                RegularPolygon(radius=p.fitting_diameter/2, side_count=6)
+            extrude(amount=p.connector_depth)
+            if not draft:
+                with span("fitting labels", "text"):
+                    with BuildSketch(outer_fitting.faces().sort_by(Axis.Y)[0]):
+                        add(text_sketch(REVISION_TEXT, p.font_path, 3))
+                    extrude(amount=-.4, mode=Mode.SUBTRACT)
+                    with BuildSketch(outer_fitting.faces().sort_by(Axis.Y)[-1]):
+                        add(text_sketch(f"OD\n{floor(p.tube_outer_diameter)}mm", p.font_path, 2))
+                    extrude(amount=-.4, mode=Mode.SUBTRACT)
             with Locations(outer_fitting.faces().sort_by(Axis.Z)[0]):
                 CounterSinkHole(
-                    radius=self.connector_diameter/2,
-                    counter_sink_radius=self.connector_diameter/2+self.connector_pitch/2
+                    radius=p.connector_diameter/2,
+                    counter_sink_radius=p.connector_diameter/2+p.connector_pitch/2
                     )
             with BuildSketch(outer_fitting.faces().sort_by(Axis.Z)[-1]):
-                Circle(self.shaft_diameter/2)
-                Circle((self.tube_outer_diameter+self.tube_outer_tolerance)/2, mode=Mode.SUBTRACT)
-            extrude(amount=self.fitting_depth)
+                Circle(p.shaft_diameter/2)
+                Circle((p.tube_outer_diameter+p.tube_outer_tolerance)/2, mode=Mode.SUBTRACT)
+            extrude(amount=p.fitting_depth)
             with BuildSketch(outer_fitting.faces().sort_by(Axis.Z)[-1]):
-                Circle(self.shaft_diameter/2-1)
-                Circle((self.tube_outer_diameter+self.tube_outer_tolerance)/2, mode=Mode.SUBTRACT)
-            extrude(amount=self.shaft_length-self.fitting_depth)
-            chamfer(
-                outer_fitting.edges()
-                .filter_by(GeomType.CIRCLE)
-                .sort_by(SortBy.RADIUS)
-                .sort_by(Axis.Z)[-1],
-                length=chamfer_radius,
-            )
-        return Compound (label="External Fitting",
-                        children=[Compound(label="Outer Fitting",
-                                            children=[outer_fitting.part]),
-                                    Compound(label="connector thread",
-                                            children=[fitting_nut_thread]),
-                                    Compound(label="shaft thread", children=[shaft_thread])])
-
-    def show(self):
-        """
-        Shows the OCP Cad Viewer Preview
-        """
-        show(self.compound)
-
-    def export_stl(self,file_path,tolerance=.0001):
-        """
-        Exports as an STL file to the given directory
-        
-        Args:
-            file_path: the path for the STL export
-            tolerance: the level of mesh detail for the STL, defaults to .0001
-        """
-        export_stl(self.compound, file_path ,tolerance=tolerance)
-
-    def export_step(self,file_path):
-        """
-        Exports as an STL file to the given directory
-        
-        Args:
-            file_path: the path for the STL export
-        """
-        export_step(self.compound, file_path)
+                Circle(p.shaft_diameter/2-1)
+                Circle((p.tube_outer_diameter+p.tube_outer_tolerance)/2, mode=Mode.SUBTRACT)
+            extrude(amount=p.shaft_length-p.fitting_depth)
+            with span("shaft chamfer", "chamfer"):
+                chamfer(
+                    outer_fitting.edges()
+                    .filter_by(GeomType.CIRCLE)
+                    .sort_by(SortBy.RADIUS)
+                    .sort_by(Axis.Z)[-1],
+                    length=self._chamfer_radius,
+                )
+        return outer_fitting.part
+
+    def _components(self):
+        """
+        Returns the closed-form volumes: the nut is a hexagonal prism less its
+        countersunk hole and the shaft two tubes less the chamfer at the top.
+        The labels are left out.
+        """
+        p = self.parameters
+        connector_radius = p.connector_diameter/2
+        nut = Component(
+            (hexagon_area(p.fitting_diameter/2) - circle_area(connector_radius))*p.connector_depth
+            - countersink_volume(connector_radius, connector_radius+p.connector_pitch/2),
+            p.fitting_diameter*sqrt(3)/4 - connector_radius)
+        bore_radius = (p.tube_outer_diameter+p.tube_outer_tolerance)/2
+        lower_shaft = Component(
+            (circle_area(p.shaft_diameter/2) - circle_area(bore_radius))*p.fitting_depth,
+            p.shaft_diameter/2 - bore_radius)
+        upper_shaft = Component(
+            (circle_area(p.shaft_diameter/2-1) - circle_area(bore_radius))
+            * (p.shaft_length-p.fitting_depth)
+            - chamfer_volume(p.shaft_diameter/2-1, self._chamfer_radius),
+            p.shaft_diameter/2 - 1 - bore_radius)
+        return {**super()._components(),
+                "Outer Fitting": combine(nut, lower_shaft, upper_shaft)}
+
+    def _print_height(self):
+        """Returns the height of the nut and the shaft."""
+        p = self.parameters
+        return p.connector_depth + p.shaft_length
@@ -0,0 +1,312 @@
+"""Module providing triangle meshes of the funnels, generated directly without the CAD kernel."""
+from math import sqrt, atan, tan, pi, acos, ceil
+from typing import NamedTuple
+import numpy as np
+
+RIM_FILLET_MARGIN = 0.98
+# the wall left between the funnel's rim and its bore
+FUNNEL_RIM_WALL = 1.5
+DEFAULT_TOLERANCE = 0.01
+
+_STL_HEADER = b"repbox-funnel binary STL".ljust(80, b" ")
+_STL_FACET = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)),
+                       ("attribute", "<u2")])
+
+
+class Mesh(NamedTuple):
+    """A closed triangle mesh."""
+    vertices: np.ndarray
+    triangles: np.ndarray
+
+
+def rim_fillet_radius(lower_radius, upper_radius, inner_radius, height, minimum_wall):
+    """
+    Function computing the largest fillet that fits on both top edges of a hex funnel.
+
+    The outer and inner fillets share the flat rim, which is minimum_wall wide across
+    the flats of the hexagon. A fillet of radius r on an edge where the faces meet at
+    an angle phi takes up r/tan(phi/2) of the rim. The outer wall meets the rim at
+    90 degrees less its flare (taken at the corners, where it flares the most) and
+    the inner wall at 90 degrees plus its flare.
+
+        Parameters:
+            lower_radius (int): The radius for the base of the funnel
+            upper_radius (int): The radius at the top of the funnel
+            inner_radius (int): The radius for the inside hole of the funnel
+            height (int): The length of the radius
+            minimum_wall(int): The thickness of the wall at the top between the outer and inner edge of the funnel
+
+        Returns:
+            radius (float): The fillet radius, less a small safety margin
+    """
+    outer_angle = pi/2 - atan((upper_radius - lower_radius)/height)
+    inner_angle = pi/2 + atan(((upper_radius/2*sqrt(3)) - minimum_wall - inner_radius)/height)
+    rim_used_per_radius = 1/tan(outer_angle/2) + 1/tan(inner_angle/2)
+    return RIM_FILLET_MARGIN * minimum_wall/rim_used_per_radius
+
+
+def _segments(radius, angle, tolerance):
+    """Returns the number of chords keeping an arc within tolerance of its chord."""
+    if radius <= tolerance:
+        return 1
+    step = 2*acos(1 - tolerance/radius)
+    return max(1, ceil(abs(angle)/step))
+
+
+def _circle_outline(radius, tolerance):
+    """
+    Returns the outline of a circle as centers, which are all the origin, and
+    outward normal angles; a point is center + radius * normal.
+    """
+    count = max(12, _segments(radius, 2*pi, tolerance))
+    angles = np.linspace(0, 2*pi, count, endpoint=False)
+    return np.zeros((count, 2)), angles
+
+
+def _rounded_hexagon_outline(radius, tolerance, inner_radius):
+    """
+    Returns the outline of a hexagon with vertices at radius and fillets of radius/4,
+    as the build123d sketch in funnels.hex_funnel is. The outline is a smaller
+    hexagon offset by the fillet radius, so each point is a center on that hexagon
+    plus the fillet radius along the outward normal. Flats are divided finely
+    enough that a circle of inner_radius sampled at the same polar angles is also
+    within tolerance.
+    """
+    fillet_radius = radius/4
+    center_radius = radius - 2*fillet_radius/sqrt(3)
+    corners = [center_radius*np.array([np.cos(k*pi/3), np.sin(k*pi/3)]) for k in range(7)]
+    corner_count = _segments(fillet_radius, pi/3, tolerance)
+    side_count = _segments(inner_radius, pi/3, tolerance)
+    centers, angles = [], []
+    for k in range(6):
+        for step in range(corner_count):
+            centers.append(corners[k])
+            angles.append(k*pi/3 - pi/6 + step*(pi/3)/corner_count)
+        for step in range(side_count):
+            centers.append(corners[k] + (corners[k+1] - corners[k])*step/side_count)
+            angles.append(k*pi/3 + pi/6)
+    return np.array(centers), np.array(angles), fillet_radius
+
+
+def _fillet_arc(wall_direction, rim_direction, radius, count):
+    """
+    Returns points on the fillets of corners at the origin between a wall and the
+    rim, from the tangent point on the wall to the tangent point on the rim.
+
+        Parameters:
+            wall_direction (ndarray): (N, 2) unit directions from each corner down the wall
+            rim_direction (ndarray): (2,) unit direction from the corners along the rim
+            radius (float): The fillet radius
+            count (int): The number of chords in each arc
+
+        Returns:
+            points (ndarray): (N, count+1, 2) points as (horizontal offset, height offset)
+    """
+    rim_direction = np.broadcast_to(rim_direction, wall_direction.shape)
+    cosine = np.clip(np.sum(wall_direction*rim_direction, axis=1), -1, 1)
+    half_angle = np.arccos(cosine)/2
+    tangent_length = radius/np.tan(half_angle)
+    bisector = wall_direction + rim_direction
+    bisector /= np.linalg.norm(bisector, axis=1)[:, None]
+    center = bisector*(radius/np.sin(half_angle))[:, None]
+    start = wall_direction*tangent_length[:, None] - center
+    end = rim_direction*tangent_length[:, None] - center
+    start_angle = np.arctan2(start[:, 1], start[:, 0])
+    sweep = np.arctan2(end[:, 1], end[:, 0]) - start_angle
+    sweep = (sweep + pi) % (2*pi) - pi
+    angles = start_angle[:, None] + sweep[:, None]*np.linspace(0, 1, count + 1)
+    return center[:, None, :] + radius*np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+
+
+def _funnel_mesh(centers, normal_angles, outline_radius, scale, inner_radius, inner_top_radius,
+                 height, fillet_radius, tolerance):
+    """
+    Function sweeping the cross section of a funnel wall around its outline.
+
+    Every outline sample gets the same sequence of points: up the outer wall, over
+    the outer fillet, across the rim, over the inner fillet, down the inner wall and
+    back across the base. The inner wall is sampled at the polar angles of the outer
+    outline, so consecutive samples form a closed grid of quads.
+
+        Parameters:
+            centers (ndarray): (N, 2) centers of the lower outline, see _circle_outline()
+            normal_angles (ndarray): (N,) outward normal angles of the lower outline
+            outline_radius (float): The distance of the lower outline from its centers
+            scale (float): The size of the upper outline relative to the lower
+            inner_radius (float): The radius of the hole at the base
+            inner_top_radius (float): The radius of the hole at the top
+            height (float): The height of the funnel
+            fillet_radius (float): The radius of the fillets around the rim, 0 for none
+            tolerance (float): The largest distance of the mesh from the fillets
+
+        Returns:
+            mesh (Mesh): The watertight mesh
+    """
+    normals = np.stack((np.cos(normal_angles), np.sin(normal_angles)), axis=1)
+    lower = centers + outline_radius*normals
+    support = np.sum(centers*normals, axis=1) + outline_radius
+    outer_flare = np.arctan((scale - 1)*support/height)
+    polar = np.arctan2(lower[:, 1], lower[:, 0])
+    radial = np.stack((np.cos(polar), np.sin(polar)), axis=1)
+    inner_flare = atan((inner_top_radius - inner_radius)/height)
+
+    def outer_point(offset, z):
+        """Outer side points offset horizontally from the corner at the top of the wall."""
+        along_normal = offset + (height - z)*np.tan(outer_flare)[:, None]
+        outline = lower[:, None, :]*(1 + (scale - 1)*z/height)[..., None]
+        return np.concatenate((outline + along_normal[..., None]*normals[:, None, :],
+                               z[..., None]), axis=-1)
+
+    def inner_point(offset, z):
+        """Inner side points offset horizontally from the corner at the top of the hole."""
+        distance = inner_top_radius + offset
+        return np.concatenate((distance[..., None]*radial[:, None, :], z[..., None]), axis=-1)
+
+    count = len(lower)
+    columns = [outer_point(-height*np.tan(outer_flare)[:, None], np.zeros((count, 1)))]
+    if fillet_radius > 0:
+        arc_count = _segments(fillet_radius, pi/2, tolerance)
+        wall = np.stack((-np.sin(outer_flare), -np.cos(outer_flare)), axis=1)
+        arc = _fillet_arc(wall, np.array([-1.0, 0.0]), fillet_radius, arc_count)
+        columns.append(outer_point(arc[..., 0], height + arc[..., 1]))
+        wall = np.tile([-np.sin(inner_flare), -np.cos(inner_flare)], (count, 1))
+        arc = _fillet_arc(wall, np.array([1.0, 0.0]), fillet_radius, arc_count)[:, ::-1]
+        columns.append(inner_point(arc[..., 0], height + arc[..., 1]))
+    else:
+        columns.append(outer_point(np.zeros((count, 1)), np.full((count, 1), float(height))))
+        columns.append(inner_point(np.zeros((count, 1)), np.full((count, 1), float(height))))
+    columns.append(inner_point(np.full((count, 1), inner_radius - inner_top_radius),
+                               np.zeros((count, 1))))
+    grid = np.concatenate(columns, axis=1)
+    rings = grid.shape[1]
+    vertices = grid.reshape(-1, 3)
+
+    around = np.arange(count)
+    along = np.arange(rings)
+    first = (around[:, None]*rings + along[None, :]).ravel()
+    next_along = (around[:, None]*rings + (along[None, :] + 1) % rings).ravel()
+    next_around = (((around[:, None] + 1) % count)*rings + along[None, :]).ravel()
+    diagonal = (((around[:, None] + 1) % count)*rings + (along[None, :] + 1) % rings).ravel()
+    triangles = np.concatenate((np.stack((first, next_around, diagonal), axis=1),
+                                np.stack((first, diagonal, next_along), axis=1)))
+    mesh = Mesh(vertices, triangles)
+    if mesh_volume(mesh) < 0:
+        mesh = Mesh(vertices, triangles[:, ::-1].copy())
+    return mesh
+
+
+def cone_funnel_mesh(lower_radius=10, upper_radius=20, inner_radius=5, height=30, minimum_wall=0,
+                     tolerance=DEFAULT_TOLERANCE):
+    """
+    Function generating a mesh of the round funnel built by funnels.cone_funnel.
+
+        Parameters:
+            lower_radius (int): The radius for the base of the funnel
+            upper_radius (int): The radius at the top of the funnel
+            inner_radius (int): The radius for the inside hole of the funnel
+            height (int): The length of the radius
+            minimum_wall(int): The thickness of the wall at the top between the outer and inner edge of the funnel
+            tolerance (float): The largest distance of the mesh from the round surfaces
+
+        Returns:
+            mesh (Mesh): A watertight mesh of the funnel
+    """
+    centers, angles = _circle_outline(upper_radius, tolerance)
+    return _funnel_mesh(centers, angles, lower_radius, upper_radius/lower_radius, inner_radius,
+                        upper_radius - minimum_wall, height, minimum_wall/4, tolerance)
+
+
+def hex_funnel_mesh(lower_radius=10, upper_radius=20, inner_radius=5, height=30, minimum_wall=0,
+                    tolerance=DEFAULT_TOLERANCE):
+    """
+    Function generating a mesh of the hexagonal funnel built by funnels.hex_funnel.
+    The rim fillet runs around both whole top edges.
+
+        Parameters:
+            lower_radius (int): The radius for the base of the funnel
+            upper_radius (int): The radius at the top of the funnel
+            inner_radius (int): The radius for the inside hole of the funnel
+            height (int): The length of the radius
+            minimum_wall(int): The thickness of the wall at the top between the outer and inner edge of the funnel
+            tolerance (float): The largest distance of the mesh from the round surfaces
+
+        Returns:
+            mesh (Mesh): A watertight mesh of the funnel
+    """
+    scale = upper_radius/lower_radius
+    inner_top_radius = upper_radius/2*sqrt(3) - minimum_wall
+    centers, angles, corner_radius = _rounded_hexagon_outline(
+        lower_radius, tolerance/scale, inner_top_radius/scale)
+    fillet_radius = 0
+    if minimum_wall > 0:
+        fillet_radius = rim_fillet_radius(lower_radius, upper_radius, inner_radius, height,
+                                          minimum_wall)
+    return _funnel_mesh(centers, angles, corner_radius, scale, inner_radius, inner_top_radius,
+                        height, fillet_radius, tolerance)
+
+
+def mesh_volume(mesh):
+    """
+    Function computing the signed volume enclosed by a closed mesh.
+
+        Parameters:
+            mesh (Mesh): The mesh
+
+        Returns:
+            volume (float): The volume, negative if the triangles are wound inward
+    """
+    first, second, third = (mesh.vertices[mesh.triangles[:, index]] for index in range(3))
+    return float(np.sum(first*np.cross(second, third))/6)
+
+
+def stl_facets(mesh):
+    """
+    Function converting a mesh to binary STL facet records.
+
+        Parameters:
+            mesh (Mesh): The mesh
+
+        Returns:
+            facets (ndarray): One 50 byte record per triangle
+    """
+    corners = mesh.vertices[mesh.triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals /= np.where(lengths > 0, lengths, 1)[:, None]
+    facets = np.zeros(len(corners), dtype=_STL_FACET)
+    facets["normal"] = normals
+    facets["vertices"] = corners
+    return facets
+
+
+def translated(mesh, offset):
+    """
+    Function moving a mesh.
+
+        Parameters:
+            mesh (Mesh): The mesh
+            offset (tuple): The (x, y, z) distance to move it
+
+        Returns:
+            mesh (Mesh): The moved mesh, sharing the triangles of the original
+    """
+    return Mesh(mesh.vertices + np.asarray(offset, dtype=float), mesh.triangles)
+
+
+def export_stl(mesh, file_path):
+    """
+    Function writing a mesh to a binary STL file.
+
+        Parameters:
+            mesh (Mesh): The mesh
+            file_path (str): The path for the STL export
+
+        Returns:
+            triangles (int): The number of triangles written
+    """
+    facets = stl_facets(mesh)
+    with open(file_path, "wb") as stl_file:
+        stl_file.write(_STL_HEADER)
+        stl_file.write(np.uint32(len(facets)).tobytes())
+        facets.tofile(stl_file)
+    return len(facets)
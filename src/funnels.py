@@ -4,7 +4,15 @@ from math import sqrt
 from build123d import (BuildPart,BuildSketch,Plane,Circle,
     loft,Part,Compound, RegularPolygon, fillet,
     Axis)
+from OCP.BRepCheck import BRepCheck_Analyzer
+from OCP.Standard import Standard_Failure
+from funnel_mesh import rim_fillet_radius
+from geometry_cache import brep_cached
+from profiling import span
 
+MAX_FILLET_ITERATIONS = 12
+
+@brep_cached("cone_funnel")
 def cone_funnel(lower_radius=10, upper_radius=20, inner_radius=5, height=30, minimum_wall=0):
     """
     Function generating a round funnel.
@@ -34,9 +42,11 @@ def cone_funnel(lower_radius=10, upper_radius=20, inner_radius=5, height=30, min
     funnel = Part(outer_funnel.part - inner_funnel.part)
     if minimum_wall > 0:
         funnel = funnel.fillet(radius=minimum_wall/4, edge_list=funnel.edges().sort_by(Axis.Z)[-2:])
-    return Compound(label="funnel", children=funnel)
+    return Compound(label="funnel", children=funnel.solids())
 
-def hex_funnel(lower_radius=10, upper_radius=20, inner_radius=5, height=30, minimum_wall=0):
+@brep_cached("hex_funnel")
+def hex_funnel(lower_radius=10, upper_radius=20, inner_radius=5, height=30, minimum_wall=0,
+               draft=False):
     """
     Function generating a funnel with a hexagonal exterior and round interior.
     
@@ -46,6 +56,8 @@ def hex_funnel(lower_radius=10, upper_radius=20, inner_radius=5, height=30, mini
             inner_radius (int): The radius for the inside hole of the funnel
             height (int): The length of the radius
             minimum_wall(int): The thickness of the wall at the top between the outer and inner edge of the funnel
+            draft(bool): Loft plain hexagons, without rounded corners, and leave
+                out the rim fillet
 
         Returns:
             funnel (Compound): A hexagon shaped funnel 
@@ -53,21 +65,42 @@ def hex_funnel(lower_radius=10, upper_radius=20, inner_radius=5, height=30, mini
     with BuildPart() as outer_funnel:
         with BuildSketch(Plane(origin=(0, 0,0), z_dir=(0, 0, 1))) as lower_sketch:
             RegularPolygon(radius=lower_radius, side_count=6)
-            fillet(lower_sketch.vertices(), radius=lower_radius/4)
+            if not draft:
+                fillet(lower_sketch.vertices(), radius=lower_radius/4)
         with BuildSketch(Plane(origin=(0, 0,height), z_dir=(0, 0, 1)))as upper_sketch:
             RegularPolygon(radius=upper_radius, side_count=6)
-            fillet(upper_sketch.vertices(), radius=upper_radius/4)
-        loft()
+            if not draft:
+                fillet(upper_sketch.vertices(), radius=upper_radius/4)
+        with span("funnel loft", "loft"):
+            loft()
 
     with BuildPart() as inner_funnel:
         with BuildSketch(Plane(origin=(0, 0,0), z_dir=(0, 0, 1))):
             Circle(inner_radius)
         with BuildSketch(Plane(origin=(0, 0,height), z_dir=(0, 0, 1))):
             Circle((upper_radius/2*sqrt(3))-minimum_wall)
-        loft()
-    funnel = Part(outer_funnel.part - inner_funnel.part)
-    if minimum_wall > 0:
+        with span("funnel loft", "loft"):
+            loft()
+    with span("funnel subtract", "boolean"):
+        funnel = Part(outer_funnel.part - inner_funnel.part)
+    if minimum_wall > 0 and not draft:
         wall_edges = funnel.edges().sort_by(Axis.Z)[-2:]
-        max_fillet_radius = funnel.max_fillet(wall_edges,max_iterations=100)
-        funnel = funnel.fillet(radius=max_fillet_radius, edge_list=wall_edges)
-    return Compound(label="funnel", children=funnel)
+        fillet_radius = rim_fillet_radius(lower_radius, upper_radius, inner_radius,
+                                          height, minimum_wall)
+        with span("funnel rim fillet", "fillet"):
+            funnel = _checked_fillet(funnel, wall_edges, fillet_radius)
+    return Compound(label="funnel", children=funnel.solids())
+
+def _checked_fillet(part, edges, radius):
+    """
+    Fillets edges with the given radius, falling back to a bounded search for the
+    largest fillet OCCT accepts if the result fails or isn't a valid solid.
+    """
+    try:
+        filleted = part.fillet(radius=radius, edge_list=edges)
+        if BRepCheck_Analyzer(filleted.wrapped).IsValid():
+            return filleted
+    except (ValueError, Standard_Failure):
+        pass
+    radius = part.max_fillet(edges, max_iterations=MAX_FILLET_ITERATIONS)
+    return part.fillet(radius=radius, edge_list=edges)
@@ -0,0 +1,69 @@
+"""Module fusing the objects of a part into a single solid for export."""
+from build123d import Compound
+from OCP.BRepAlgoAPI import BRepAlgoAPI_Fuse
+from OCP.BRepCheck import BRepCheck_Analyzer
+from profiling import span
+
+try:
+    from OCP.TopTools import TopTools_ListOfShape
+except ImportError:
+    # OCP 8 exposes the OCCT collections under their template names
+    from OCP.collections import List_TopoDS_Shape as TopTools_ListOfShape
+
+# the threads overlap the body by their interference, orders of magnitude more
+# than this, so the fuzzy value only merges faces that are coincident to within
+# modelling noise -- which the exact boolean would split into slivers slowly
+DEFAULT_FUZZY_VALUE = 1e-4
+# the relative error allowed in the fused volume, far larger than the volume
+# the fuzzy value can merge away but far smaller than a dropped object
+VOLUME_TOLERANCE = 1e-3
+
+
+def fuse(shapes, label, fuzzy_value=DEFAULT_FUZZY_VALUE):
+    """
+    Function fusing overlapping shapes into one solid, e.g. a body and the
+    threads built separately around it.
+
+        Parameters:
+            shapes (list): The shapes to fuse, the first being the body
+            label (str): The label of the fused shape
+            fuzzy_value (float): The distance within which faces and edges are
+                treated as coincident
+
+        Returns:
+            fused (Compound): The fused solid, with the faces the fuse split
+                along the same surface merged again
+
+        Raises:
+            ValueError: If the fuse fails or doesn't give one valid solid, as
+                exporting it would give overlapping shells, or if the solid is
+                smaller than the largest shape or larger than all of them
+    """
+    arguments = TopTools_ListOfShape()
+    arguments.Append(shapes[0].wrapped)
+    tools = TopTools_ListOfShape()
+    for shape in shapes[1:]:
+        tools.Append(shape.wrapped)
+    operation = BRepAlgoAPI_Fuse()
+    operation.SetArguments(arguments)
+    operation.SetTools(tools)
+    operation.SetFuzzyValue(fuzzy_value)
+    operation.SetRunParallel(True)
+    with span("fuse", "boolean"):
+        operation.Build()
+    if not operation.IsDone():
+        raise ValueError(f"fusing the objects of {label} failed")
+    with span("fuse simplify", "boolean"):
+        operation.SimplifyResult()
+    fused = Compound(operation.Shape(), label=label)
+    solids = len(fused.solids())
+    if solids != 1:
+        raise ValueError(f"fusing the objects of {label} gave {solids} solids instead of one")
+    if not BRepCheck_Analyzer(fused.wrapped).IsValid():
+        raise ValueError(f"fusing the objects of {label} gave an invalid solid")
+    volumes = [shape.volume for shape in shapes]
+    smallest, largest = max(volumes)*(1 - VOLUME_TOLERANCE), sum(volumes)*(1 + VOLUME_TOLERANCE)
+    if not smallest <= fused.volume <= largest:
+        raise ValueError(f"fusing the objects of {label} gave a solid of {fused.volume:.1f}mm³, "
+                         f"outside {max(volumes):.1f} to {sum(volumes):.1f}mm³")
+    return fused
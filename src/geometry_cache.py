@@ -0,0 +1,110 @@
+"""Module providing a persistent, content addressed cache of built geometry."""
+import hashlib
+import inspect
+import json
+import os
+import struct
+from functools import lru_cache, wraps
+from profiling import span, record_topology
+from serialization import dumps, loads
+from versions import library_versions, source_digest
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "geometry")
+
+cache_directory = os.environ.get("REPBOX_CACHE_DIR", DEFAULT_CACHE_DIRECTORY)
+enabled = os.environ.get("REPBOX_CACHE", "1") != "0"
+
+
+@lru_cache(maxsize=None)
+def _source_digest():
+    """
+    Returns a digest of the modules building the parts, read once per process.
+    A builder's own source isn't enough: it also reads module constants such as
+    the revision label and calls helpers defined elsewhere.
+    """
+    return source_digest()
+
+
+def cache_key(name, builder, params) -> str:
+    """
+    Computes the content address of a built shape.
+
+        Parameters:
+            name (str): A name for the kind of geometry being built
+            builder (callable): The function or class that builds the shape
+            params (dict): The keyword arguments passed to the builder
+
+        Returns:
+            key (str): A hex digest of the builder, its inputs, the source of the
+                part modules and the library versions
+    """
+    description = json.dumps({
+        "cache_version": CACHE_VERSION,
+        "name": name,
+        "builder": getattr(builder, "__qualname__", repr(builder)),
+        "source": _source_digest(),
+        "libraries": library_versions(),
+        "params": params,
+        }, sort_keys=True, default=repr)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def cached_shape(name, builder, **params):
+    """
+    Returns builder(**params), reusing a previously stored result with the same
+    inputs when there is one. Results are stored as binary BREP files so they
+    are shared between runs and between processes.
+
+        Parameters:
+            name (str): A name for the kind of geometry being built
+            builder (callable): The function or class that builds the shape
+            params: The keyword arguments passed to the builder
+
+        Returns:
+            shape (Shape): The built or restored shape
+    """
+    if not enabled:
+        with span(name, "geometry") as arguments:
+            shape = builder(**params)
+            record_topology(arguments, shape)
+        return shape
+    key = cache_key(name, builder, params)
+    path = os.path.join(cache_directory, name, f"{key}.brep")
+    if os.path.exists(path):
+        try:
+            with span(name, "cache"), open(path, "rb") as cache_file:
+                return loads(cache_file.read())
+        except (OSError, ValueError, struct.error):
+            # unreadable or truncated entries are built and stored again
+            pass
+    with span(name, "geometry") as arguments:
+        shape = builder(**params)
+        record_topology(arguments, shape)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as cache_file:
+        cache_file.write(dumps(shape))
+    os.replace(temporary_path, path)
+    return shape
+
+
+def brep_cached(name):
+    """
+    Decorator caching a geometry builder with cached_shape(). Positional and
+    default arguments are resolved so equal calls share an entry.
+
+        Parameters:
+            name (str): A name for the kind of geometry being built
+    """
+    def decorator(builder):
+        signature = inspect.signature(builder)
+
+        @wraps(builder)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return cached_shape(name, builder, **bound.arguments)
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+"""Checks how long the part modules take to import in a fresh interpreter."""
+import argparse
+import os
+import subprocess
+import sys
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULES = ('external_fitting', 'internal_funnel')
+DEFAULT_BUDGET = 3.0
+# optional or heavy modules that should only load when they are actually used
+DEFERRED_MODULES = ('ocp_vscode', 'bd_warehouse')
+
+
+def measure(module):
+    """
+    Imports a module in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        tuple: The cumulative import time in seconds, a list of
+        (seconds, name) for each module it imports directly, and the
+        deferred modules that were loaded anyway.
+    """
+    probe = (f'import sys, {module}\n'
+             f'print(",".join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                            cwd=SOURCE_DIRECTORY, capture_output=True, text=True, check=True)
+    total = None
+    imports = []
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are listed before their parent, indented two spaces a level
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        timing = (int(cumulative) / 1e6, name.strip())
+        if level == 1:
+            children.append(timing)
+        elif level == 0:
+            if timing[1] == module:
+                total, imports = timing[0], children
+            children = []
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return total, imports, loaded
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help=f'maximum seconds per module (default: {DEFAULT_BUDGET})')
+    parser.add_argument('--top', type=int, default=5,
+                        help='number of slowest direct imports to list')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        total, imports, loaded = measure(module)
+        status = 'ok' if total <= args.budget and not loaded else 'OVER BUDGET'
+        print(f'{module}: {total:.3f}s of {args.budget:.3f}s {status}')
+        for seconds, name in sorted(imports, reverse=True)[:args.top]:
+            print(f'    {seconds:.3f}s {name}')
+        if loaded:
+            print(f'    loaded eagerly: {", ".join(loaded)}')
+        failed = failed or status != 'ok'
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Module providing the text sketches embossed as labels on the parts."""
+from functools import lru_cache
+from build123d import BuildSketch, Text, Align
+
+TEXT_CACHE_SIZE = 64
+CENTERED = (Align.CENTER, Align.CENTER)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_sketch(text, font_path, font_size, align=CENTERED):
+    """
+    Function generating the sketch of a label. Loading the font and converting
+    its glyph outlines is slow and the same few labels are used by every
+    variant, so sketches are kept for reuse within the process.
+
+        Parameters:
+            text (str): The label
+            font_path (str): The font used for the label
+            font_size (float): The size of the text
+            align (tuple): The alignment of the text about the origin
+
+        Returns:
+            sketch (Sketch): The label, on the XY plane
+    """
+    with BuildSketch() as sketch:
+        Text(text, font_path=font_path, font_size=font_size, align=align)
+    return sketch.sketch
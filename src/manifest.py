@@ -0,0 +1,147 @@
+"""Module recording what each export was built from, so unchanged exports can be skipped."""
+import hashlib
+import json
+import os
+from dataclasses import fields
+from versions import EXPORT_MODULES, GEOMETRY_MODULES, library_versions, source_digest
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def parameters_digest(parameters):
+    """
+    Computes a digest of a part's parameters.
+
+    Args:
+        parameters (Parameters): The resolved parameters.
+
+    Returns:
+        str: A hex digest of every parameter value.
+    """
+    values = {spec.name: getattr(parameters, spec.name) for spec in fields(parameters)}
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+
+def input_digest(part, parameters, file_format, options):
+    """
+    Computes a digest of everything an export depends on: the part and its
+    parameters, the export settings, the code building it and the versions of
+    the CAD libraries.
+
+    Args:
+        part (str): The kind of part, e.g. 'internal-funnel'.
+        parameters (Parameters): The resolved parameters.
+        file_format (str): 'stl', '3mf' or 'step'.
+        options (dict): Any export settings that change the output.
+
+    Returns:
+        str: A hex digest of the inputs.
+    """
+    description = json.dumps({
+        "manifest_version": MANIFEST_VERSION,
+        "part": part,
+        "format": file_format,
+        "options": options,
+        "parameters": parameters_digest(parameters),
+        "source": source_digest(GEOMETRY_MODULES + EXPORT_MODULES),
+        "libraries": library_versions(),
+        }, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def file_digest(file_path):
+    """
+    Computes the SHA-256 digest of a file.
+
+    Args:
+        file_path (str): The file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as digest_file:
+        for block in iter(lambda: digest_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """The inputs and digests of the exports in an output directory."""
+    def __init__(self, directory, entries=None):
+        """
+        Initialize the manifest.
+
+        Args:
+            directory (str): The output directory.
+            entries (dict): The recorded exports, keyed by file name.
+        """
+        self.directory = directory
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Read the manifest of an output directory; it is empty if there is none
+        or it can't be read.
+
+        Args:
+            directory (str): The output directory.
+
+        Returns:
+            Manifest: The manifest.
+        """
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as manifest_file:
+                entries = json.load(manifest_file)["outputs"]
+        except (OSError, ValueError, KeyError):
+            entries = {}
+        return cls(directory, entries)
+
+    def is_current(self, file_path, inputs):
+        """
+        Check whether an export was built from the given inputs and hasn't
+        been changed since.
+
+        Args:
+            file_path (str): The export.
+            inputs (str): The digest of its inputs, see input_digest().
+
+        Returns:
+            bool: True if the export can be kept as it is.
+        """
+        entry = self.entries.get(os.path.basename(file_path))
+        if entry is None or entry["inputs"] != inputs or not os.path.exists(file_path):
+            return False
+        return file_digest(file_path) == entry["sha256"]
+
+    def record(self, file_path, inputs, parameters, triangles=None, seconds=None):
+        """
+        Record an export that was just written.
+
+        Args:
+            file_path (str): The export.
+            inputs (str): The digest of its inputs, see input_digest().
+            parameters (Parameters): The parameters it was built from.
+            triangles (int): The number of mesh triangles, if it is a mesh.
+            seconds (float): How long the part took to build and export.
+        """
+        self.entries[os.path.basename(file_path)] = {
+            "inputs": inputs,
+            "parameters": parameters_digest(parameters),
+            "source": source_digest(GEOMETRY_MODULES + EXPORT_MODULES),
+            "libraries": library_versions(),
+            "sha256": file_digest(file_path),
+            "triangles": triangles,
+            "seconds": round(seconds, 3) if seconds is not None else None,
+            }
+
+    def save(self):
+        """Write the manifest to the output directory."""
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump({"version": MANIFEST_VERSION, "outputs": self.entries}, manifest_file,
+                      indent=2, sort_keys=True)
+        os.replace(temporary_path, path)
@@ -0,0 +1,267 @@
+"""Module providing streaming binary STL and 3MF writers for meshed parts."""
+import io
+import struct
+import zipfile
+from contextlib import contextmanager
+from itertools import chain
+from xml.sax.saxutils import quoteattr
+import numpy as np
+from OCP.BRep import BRep_Tool
+from OCP.TopAbs import TopAbs_Orientation
+from OCP.TopLoc import TopLoc_Location
+from funnel_mesh import Mesh, stl_facets
+from profiling import span
+from tessellation import clear_mesh, faces
+
+_STL_HEADER = b"repbox-funnel binary STL".ljust(80, b" ")
+_STL_COUNT = struct.Struct("<I")
+
+_3MF_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+_3MF_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+_3MF_MODEL_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">
+<resources>
+"""
+
+
+def labelled_parts(compound):
+    """
+    Function listing the objects to export from a part: its labelled child
+    compounds, or the part itself if it has none.
+
+        Parameters:
+            compound (Compound): The part
+
+        Returns:
+            parts (list): (label, shape) pairs
+    """
+    children = list(compound.children)
+    if not children:
+        return [(compound.label, compound)]
+    return [(child.label, child) for child in children]
+
+
+def face_mesh(face):
+    """
+    Function reading the triangulation of a meshed face into arrays. OCP has no
+    buffer access to the nodes and triangles, so each array is filled by one
+    np.fromiter() pass over them, and the face's location is applied to all of
+    its nodes at once.
+
+        Parameters:
+            face (TopoDS_Face): The meshed face
+
+        Returns:
+            mesh (Mesh): Its nodes and triangles, wound outward, or None if the
+                face isn't meshed
+    """
+    location = TopLoc_Location()
+    triangulation = BRep_Tool.Triangulation_s(face, location)
+    if triangulation is None or triangulation.NbTriangles() == 0:
+        return None
+    nodes, count = triangulation.NbNodes(), triangulation.NbTriangles()
+    node, triangle = triangulation.Node, triangulation.Triangle
+    vertices = np.fromiter(chain.from_iterable(node(index).Coord()
+                                               for index in range(1, nodes + 1)),
+                           dtype=float, count=3*nodes).reshape(-1, 3)
+    triangles = np.fromiter(chain.from_iterable(triangle(index).Get()
+                                                for index in range(1, count + 1)),
+                            dtype=np.int64, count=3*count).reshape(-1, 3) - 1
+    if face.Orientation() == TopAbs_Orientation.TopAbs_REVERSED:
+        triangles = triangles[:, (0, 2, 1)]
+    if not location.IsIdentity():
+        transform = location.Transformation()
+        matrix = np.array([[transform.Value(row, column) for column in (1, 2, 3, 4)]
+                           for row in (1, 2, 3)])
+        vertices = vertices @ matrix[:, :3].T + matrix[:, 3]
+    return Mesh(vertices, triangles)
+
+
+def triangle_mesh(shape):
+    """
+    Function reading the triangulation of a meshed shape into a Mesh, so it can
+    be written several times without meshing it again.
+
+        Parameters:
+            shape (Shape): The meshed shape
+
+        Returns:
+            mesh (Mesh): Its triangles, with separate vertices for each face
+    """
+    vertices = []
+    triangles = []
+    offset = 0
+    for face in faces(shape.wrapped):
+        meshed = face_mesh(face)
+        if meshed is None:
+            continue
+        vertices.append(meshed.vertices)
+        triangles.append(meshed.triangles + offset)
+        offset += len(meshed.vertices)
+    if not triangles:
+        return Mesh(np.empty((0, 3)), np.empty((0, 3), dtype=int))
+    return Mesh(np.concatenate(vertices), np.concatenate(triangles))
+
+
+def write_stl(file_path, parts, mesh):
+    """
+    Function writing parts to a binary STL file one face at a time. Each part is
+    meshed just before it is written and its mesh is released afterwards, so only
+    one part's triangulation is held at once. Parts that are already a Mesh are
+    written as they are.
+
+        Parameters:
+            file_path (str): The path for the STL export
+            parts (list): (label, shape) pairs, see labelled_parts(); a shape may
+                also be a funnel_mesh.Mesh
+            mesh (callable): Meshes a shape in place
+
+        Returns:
+            triangles (int): The number of triangles written
+    """
+    count = 0
+    with open(file_path, "wb") as stl_file:
+        stl_file.write(_STL_HEADER)
+        stl_file.write(_STL_COUNT.pack(0))
+        for label, shape in parts:
+            if isinstance(shape, Mesh):
+                with span(f"write {label}", "export"):
+                    stl_file.write(stl_facets(shape).tobytes())
+                count += len(shape.triangles)
+                continue
+            with span(f"mesh {label}", "tessellation"):
+                mesh(shape)
+            with span(f"write {label}", "export") as arguments:
+                part_count = 0
+                for face in faces(shape.wrapped):
+                    meshed = face_mesh(face)
+                    if meshed is None:
+                        continue
+                    stl_file.write(stl_facets(meshed).tobytes())
+                    part_count += len(meshed.triangles)
+                if arguments is not None:
+                    arguments["triangles"] = part_count
+            count += part_count
+            clear_mesh(shape)
+        stl_file.seek(len(_STL_HEADER))
+        stl_file.write(_STL_COUNT.pack(count))
+    return count
+
+
+def write_3mf(file_path, parts, mesh):
+    """
+    Function writing parts to a 3MF file, one mesh object per part. Each part is
+    meshed just before it is written and its mesh is released afterwards, so only
+    the arrays of the part being written are held in memory.
+
+        Parameters:
+            file_path (str): The path for the 3MF export
+            parts (list): (label, shape) pairs, see labelled_parts()
+            mesh (callable): Meshes a shape in place
+
+        Returns:
+            triangles (int): The number of triangles written
+    """
+    count = 0
+    with _3mf_model(file_path) as model:
+        object_ids = []
+        for object_id, (label, shape) in enumerate(parts, start=1):
+            with span(f"mesh {label}", "tessellation"):
+                mesh(shape)
+            with span(f"write {label}", "export") as arguments:
+                part_count = _write_3mf_mesh(model, object_id, label, triangle_mesh(shape))
+                if arguments is not None:
+                    arguments["triangles"] = part_count
+            count += part_count
+            clear_mesh(shape)
+            object_ids.append(object_id)
+        model.write("</resources>\n<build>\n")
+        for object_id in object_ids:
+            model.write(f'<item objectid="{object_id}"/>\n')
+        model.write("</build>\n")
+    return count
+
+
+def write_3mf_plate(file_path, assemblies, items):
+    """
+    Function writing a build plate to a 3MF file. Each assembly is written once,
+    as a mesh object per part grouped by a components object, and placed on the
+    plate by as many build items as it has copies.
+
+        Parameters:
+            file_path (str): The path for the 3MF export
+            assemblies (list): (name, parts) pairs, where parts are (label, Mesh) pairs
+            items (list): (assembly index, (x, y, z) offset) for each copy on the plate
+
+        Returns:
+            triangles (int): The number of triangles written, counting each assembly once
+    """
+    count = 0
+    with _3mf_model(file_path) as model:
+        object_id = 0
+        assembly_ids = []
+        for name, parts in assemblies:
+            component_ids = []
+            for label, part_mesh in parts:
+                object_id += 1
+                count += _write_3mf_mesh(model, object_id, label, part_mesh)
+                component_ids.append(object_id)
+            object_id += 1
+            model.write(f'<object id="{object_id}" name={quoteattr(name)} type="model">\n'
+                        '<components>\n')
+            for component_id in component_ids:
+                model.write(f'<component objectid="{component_id}"/>\n')
+            model.write("</components>\n</object>\n")
+            assembly_ids.append(object_id)
+        model.write("</resources>\n<build>\n")
+        for index, (x, y, z) in items:
+            # adding zero turns -0.0 into 0.0
+            x, y, z = x + 0.0, y + 0.0, z + 0.0
+            model.write(f'<item objectid="{assembly_ids[index]}" '
+                        f'transform="1 0 0 0 1 0 0 0 1 {x:.6f} {y:.6f} {z:.6f}"/>\n')
+        model.write("</build>\n")
+    return count
+
+
+@contextmanager
+def _3mf_model(file_path):
+    """
+    Opens a 3MF archive and yields its model as a text stream, after the opening
+    of the resources; the caller writes the resources and the build.
+    """
+    with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _3MF_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _3MF_RELATIONSHIPS)
+        with archive.open("3D/3dmodel.model", "w", force_zip64=True) as model_file:
+            model = io.TextIOWrapper(model_file, encoding="utf-8")
+            model.write(_3MF_MODEL_HEADER)
+            yield model
+            model.write("</model>\n")
+            model.flush()
+            model.detach()
+
+
+def _write_3mf_mesh(model, object_id, label, part_mesh):
+    """Writes a Mesh as a 3MF mesh object and returns its triangle count."""
+    vertices, indices = np.unique(np.round(part_mesh.vertices, 6), axis=0, return_inverse=True)
+    triangles = indices.reshape(-1)[part_mesh.triangles]
+    triangles = triangles[(triangles[:, 0] != triangles[:, 1]) &
+                          (triangles[:, 1] != triangles[:, 2]) &
+                          (triangles[:, 2] != triangles[:, 0])]
+    model.write(f'<object id="{object_id}" name={quoteattr(label or "")} type="model">\n'
+                '<mesh>\n<vertices>\n')
+    model.writelines(f'<vertex x="{x}" y="{y}" z="{z}"/>\n' for x, y, z in vertices.tolist())
+    model.write("</vertices>\n<triangles>\n")
+    model.writelines(f'<triangle v1="{first}" v2="{second}" v3="{third}"/>\n'
+                     for first, second, third in triangles.tolist())
+    model.write("</triangles>\n</mesh>\n</object>\n")
+    return len(triangles)
@@ -0,0 +1,193 @@
+"""Module providing the parameters of the repbox parts, parsed once from an ini file."""
+from configparser import ConfigParser
+from dataclasses import dataclass, field, fields, replace
+
+
+def _parameter(section, option, default, doc):
+    """Declares a parameter stored as `option` in `section` of the ini file."""
+    return field(default=default,
+                 metadata={"section": section, "option": option, "doc": doc})
+
+
+@dataclass(frozen=True, slots=True)
+class Parameters:
+    """
+    The dimensions, tolerances and font of a part. Instances are immutable and
+    hashable, so they can key caches and be sent to worker processes; use
+    replace() to derive a variant.
+    """
+    connector_depth: float = _parameter(
+        "connector", "depth", 6.5, "The depth of the connector.")
+    connector_diameter: float = _parameter(
+        "connector", "diameter", 10.1, "The diameter of the connector.")
+    connector_pitch: float = _parameter(
+        "connector", "pitch", 0.874, "The pitch of the connector.")
+    shaft_length: float = _parameter(
+        "shaft", "length", 20.0, "The length of the shaft.")
+    shaft_diameter: float = _parameter(
+        "shaft", "diameter", 11.5, "The diameter of the shaft.")
+    shaft_interference: float = _parameter(
+        "shaft", "interference", 0.5,
+        "The amount the shaft thread overlaps with the shaft. Adjust if the "
+        "threads don't seem properly fused to the shaft.")
+    fitting_diameter: float = _parameter(
+        "fitting", "diameter", 17.5, "The diameter of the fitting.")
+    fitting_depth: float = _parameter(
+        "fitting", "depth", 4.5, "The depth of the fitting.")
+    fitting_pitch: float = _parameter(
+        "fitting", "pitch", 1.25, "The pitch of the fitting threads.")
+    fitting_tolerance: float = _parameter(
+        "fitting", "tolerance", 0.5, "The tolerance of the fitting threads.")
+    hex_diameter: float = _parameter(
+        "fitting", "hex_diameter", 21.0, "The diameter of the external hexagon.")
+    hex_depth: float = _parameter(
+        "fitting", "hex_depth", 5.0, "The depth of the external hexagon.")
+    funnel_length: float = _parameter(
+        "funnel", "length", 40.0, "The length of the funnel.")
+    funnel_top_scale: float = _parameter(
+        "funnel", "top_scale", 1.5,
+        "The scale of the top of the funnel (A scale of 2 would mean that the top "
+        "of the funnel is 2x larger than the base).")
+    bend_angle: float = _parameter(
+        "bend", "angle", 10.0, "The angle at which the funnel is bent.")
+    tube_inner_diameter: float = _parameter(
+        "tube", "inner_diameter", 3.0,
+        "The inner diameter of the PTFE tube path. Note: this is the value as "
+        "printed but tolerance is added in the calculated size of the tube path.")
+    tube_inner_tolerance: float = _parameter(
+        "tube", "inner_tolerance", 0.4,
+        "The inner tolerance of the PTFE tube path. This value is added to the "
+        "inner diameter in the calculated size of the inner diameter of the tube.")
+    tube_outer_diameter: float = _parameter(
+        "tube", "outer_diameter", 6.0,
+        "The diameter of the PTFE tube path. Note: this is the value as printed "
+        "but tolerance is added in the calculated size of the tube path.")
+    tube_outer_tolerance: float = _parameter(
+        "tube", "outer_tolerance", 0.5,
+        "The tolerance of the PTFE tube path. This value is added to the diameter "
+        "in the calculated size of the tube path.")
+    font_path: str = _parameter(
+        "general", "font-path", "C:\\Windows\\Fonts\\arial.ttf",
+        "The path of the font used for embossing labels.")
+
+    def __post_init__(self):
+        """Validates the parameters."""
+        invalid = [spec.name for spec in fields(self)
+                   if spec.type is float and not getattr(self, spec.name) >= 0]
+        if invalid:
+            raise ValueError(f"parameters must be non-negative numbers: {', '.join(invalid)}")
+
+    def __reduce__(self):
+        """Pickles as the class and a tuple of values."""
+        return (self.__class__, tuple(getattr(self, spec.name) for spec in fields(self)))
+
+    @classmethod
+    def from_config(cls, config, base=None):
+        """
+        Parse the parameters from a ConfigParser.
+
+        Args:
+            config (ConfigParser): The parsed configuration.
+            base (Parameters): The values used for options the config doesn't
+                set; the defaults if None.
+
+        Returns:
+            Parameters: The parsed parameters.
+        """
+        base = base or cls()
+        values = {}
+        for spec in fields(cls):
+            section, option = spec.metadata["section"], spec.metadata["option"]
+            if not config.has_option(section, option):
+                continue
+            if spec.type is float:
+                values[spec.name] = config.getfloat(section, option)
+            else:
+                values[spec.name] = config.get(section, option)
+        return replace(base, **values)
+
+    @classmethod
+    def from_file(cls, config_file, base=None):
+        """
+        Parse the parameters from an ini file.
+
+        Args:
+            config_file (str): Path to the configuration file.
+            base (Parameters): The values used for options the file doesn't
+                set; the defaults if None.
+
+        Returns:
+            Parameters: The parsed parameters.
+        """
+        config = ConfigParser()
+        config.read(config_file)
+        return cls.from_config(config, base)
+
+    def to_config(self):
+        """
+        Get the parameters as a ConfigParser, for writing an ini file.
+
+        Returns:
+            ConfigParser: A config with every option set.
+        """
+        config = ConfigParser()
+        for spec in fields(self):
+            section, option = spec.metadata["section"], spec.metadata["option"]
+            if not config.has_section(section):
+                config.add_section(section)
+            config.set(section, option, str(getattr(self, spec.name)))
+        return config
+
+    def replace(self, **changes):
+        """
+        Get a copy with some parameters changed. Numbers are converted to
+        floats, so values may be given as ints or strings.
+
+        Returns:
+            Parameters: The new parameters.
+        """
+        return replace(self, **{name: coerce(name, value) for name, value in changes.items()})
+
+    def changed(self, other):
+        """
+        Get the names of the parameters that differ from another instance.
+
+        Args:
+            other (Parameters): The parameters to compare with.
+
+        Returns:
+            list: The names of the differing parameters.
+        """
+        return [spec.name for spec in fields(self)
+                if getattr(self, spec.name) != getattr(other, spec.name)]
+
+    @staticmethod
+    def key(name):
+        """
+        Get the ini key of a parameter.
+
+        Args:
+            name (str): The name of the parameter.
+
+        Returns:
+            str: The key, written as "section.option".
+        """
+        return KEYS[name]
+
+
+PARAMETER_FIELDS = {spec.name: spec for spec in fields(Parameters)}
+KEYS = {name: f"{spec.metadata['section']}.{spec.metadata['option']}"
+        for name, spec in PARAMETER_FIELDS.items()}
+
+
+def coerce(name, value):
+    """
+    Convert a value to the type of a parameter.
+
+    Args:
+        name (str): The name of the parameter.
+        value: The value to convert.
+    """
+    if name not in PARAMETER_FIELDS:
+        raise AttributeError(f"unknown parameter '{name}'")
+    return float(value) if PARAMETER_FIELDS[name].type is float else str(value)
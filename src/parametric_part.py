@@ -0,0 +1,405 @@
+"""Module providing the base class of the configurable repbox parts."""
+from build123d import Compound, Location, export_step
+from estimate import Component, PrintSettings, print_estimate, thread_volume
+from funnel_mesh import Mesh, translated
+from fusion import fuse
+from geometry_cache import cached_shape
+from mesh_writers import labelled_parts, triangle_mesh, write_stl, write_3mf
+from parameters import Parameters, PARAMETER_FIELDS
+from profiling import span
+from serialization import dumps, loads
+from stage_graph import StageCache
+from tessellation import clear_mesh, mesh_features, mesh_uniform
+from thread_mesh import thread_mesh
+from threads import trapezoidal_thread
+from validation import InvalidParameters, check
+
+
+def parameter(name):
+    """
+    Declares a property reading and writing one of a part's Parameters.
+
+    Args:
+        name (str): The name of the parameter.
+    """
+    def getter(self):
+        return getattr(self._parameters, name)
+
+    def setter(self, value):
+        self.parameters = self._parameters.replace(**{name: value})
+
+    return property(getter, setter, doc=PARAMETER_FIELDS[name].metadata["doc"])
+
+
+class ParametricPart:
+    """
+    A part built from Parameters in stages. Subclasses set STAGES to the
+    StageGraph of their build, implement _build_<stage>(draft) for each stage
+    and list the exported objects, each the result of a stage, in OBJECTS.
+    """
+    STAGES = None
+    LABEL = None
+    # the label of each object in the part's compound and the stage building it
+    OBJECTS = {}
+    # stages whose geometry is stored in the disk cache, so building them once
+    # makes them cheap for every other part with the same inputs
+    CACHED_STAGES = ()
+    THREAD_LABELS = ()
+
+    def __init__(self, config_file=None, draft=False, parameters=None):
+        """
+        Initialize the part by loading a configuration file.
+
+        Args:
+            config_file (str): Path to the configuration file.
+            draft (bool): Preview with cheap stand-ins for the threads, labels
+                and fillets. Exports are always built at full fidelity.
+            parameters (Parameters): The parameters to start from, before the
+                configuration file is applied; the defaults if None.
+        """
+        self.draft = draft
+        self._parameters = parameters or Parameters()
+        self._stages = {False: StageCache(self.STAGES), True: StageCache(self.STAGES)}
+        if config_file is not None:
+            self.load_config(config_file)
+
+    def __getstate__(self):
+        """
+        Pickles the parameters and every built stage, as BREP, so a part can be
+        sent to another process without it building the stages again.
+        """
+        return {"draft": self.draft, "parameters": self._parameters,
+                "stages": {draft: {stage: dumps(result)
+                                   for stage, result in stages.results.items()}
+                           for draft, stages in self._stages.items()}}
+
+    def __setstate__(self, state):
+        """Restores a part pickled by __getstate__()."""
+        self.draft = state["draft"]
+        self._parameters = state["parameters"]
+        self._stages = {False: StageCache(self.STAGES), True: StageCache(self.STAGES)}
+        for draft, results in state["stages"].items():
+            # stages were built, and are restored, after the stages they read
+            for stage, data in results.items():
+                self._stages[draft].put(stage, loads(data))
+
+    def load_config(self, config_file):
+        """
+        Update config values by loading a configuration file.
+
+        Args:
+            config_file (str): Path to the configuration file.
+        """
+        self.parameters = Parameters.from_file(config_file, base=self._parameters)
+
+    @property
+    def parameters(self):
+        """
+        Get the parameters of the part.
+
+        Returns:
+            Parameters: The parameters of the part.
+        """
+        return self._parameters
+
+    @parameters.setter
+    def parameters(self, parameters):
+        """
+        Set the parameters of the part, discarding the cached stages that read
+        any parameter that changed.
+
+        Args:
+            Parameters: The new parameters.
+        """
+        for name in parameters.changed(self._parameters):
+            for stages in self._stages.values():
+                stages.invalidate(Parameters.key(name))
+        self._parameters = parameters
+
+    connector_depth = parameter("connector_depth")
+    connector_diameter = parameter("connector_diameter")
+    connector_pitch = parameter("connector_pitch")
+    shaft_length = parameter("shaft_length")
+    shaft_diameter = parameter("shaft_diameter")
+    shaft_interference = parameter("shaft_interference")
+    fitting_diameter = parameter("fitting_diameter")
+    fitting_depth = parameter("fitting_depth")
+    fitting_pitch = parameter("fitting_pitch")
+    fitting_tolerance = parameter("fitting_tolerance")
+    hex_diameter = parameter("hex_diameter")
+    hex_depth = parameter("hex_depth")
+    tube_outer_diameter = parameter("tube_outer_diameter")
+    tube_outer_tolerance = parameter("tube_outer_tolerance")
+    font_path = parameter("font_path")
+
+    @property
+    def compound(self) -> Compound:
+        """
+        Returns a Compound for the complete part, as a draft if the part was
+        created with draft=True.
+        """
+        return self.build(draft=self.draft)
+
+    def build(self, draft=False) -> Compound:
+        """
+        Returns a Compound for the complete part. Each stage is cached and only
+        the stages that read a changed parameter, plus the assembly, are rebuilt.
+
+        Args:
+            draft (bool): Substitute plain tubes for the threads, leave out the
+                embossed labels and use coarse fillets.
+
+        Raises:
+            InvalidParameters: If the parameters describe geometry that can't
+                be built, before any of it is built.
+        """
+        self.validate()
+        return self.stage("compound", draft)
+
+    def violations(self):
+        """
+        Checks the parameters against the constraints of the part's stages.
+
+        Returns:
+            list: A Violation for each broken constraint, empty if the part
+            can be built.
+        """
+        return check(self._parameters, self.STAGES.stages)
+
+    def validate(self):
+        """
+        Raises InvalidParameters if the part's parameters break any constraint
+        of its stages.
+        """
+        violations = self.violations()
+        if violations:
+            raise InvalidParameters(violations)
+
+    def stage(self, name, draft=False):
+        """
+        Returns the result of one build stage, building it with
+        _build_<name>() if it isn't cached.
+
+        Args:
+            name (str): The name of the stage.
+            draft (bool): Build the draft version of the stage.
+        """
+        return self._stages[draft].get(name, lambda: getattr(self, f"_build_{name}")(draft))
+
+    def dump_objects(self, fused=False, mesh_threads=False):
+        """
+        Builds the stage of each exported object and serializes it as BREP, to
+        hand the built part to another process.
+
+        Args:
+            fused (bool): Build and serialize the fused stage instead.
+            mesh_threads (bool): Leave out the threads, for exports that
+                generate their meshes from the thread profile instead.
+
+        Returns:
+            dict: The serialized result of each object's stage, keyed by stage.
+        """
+        if fused:
+            self.validate()
+            return {"fused": dumps(self.stage("fused"))}
+        threads = self._thread_placements() if mesh_threads else {}
+        return {stage: dumps(self.stage(stage)) for label, stage in self.OBJECTS.items()
+                if label not in threads}
+
+    def load_objects(self, objects):
+        """
+        Uses objects built by another process, see dump_objects(), so that
+        exporting the part doesn't build them again.
+
+        Args:
+            objects (dict): The serialized result of each object's stage.
+        """
+        for stage, data in objects.items():
+            self._stages[False].put(stage, loads(data))
+
+    def _build_compound(self, draft) -> Compound:
+        """Builds the Compound for the complete part, with a child for each object."""
+        return Compound(label=self.LABEL,
+                        children=[Compound(label=label, children=[self.stage(stage, draft)])
+                                  for label, stage in self.OBJECTS.items()])
+
+    def _build_fused(self, draft):
+        """
+        Fuses the threads into the body, for exporting the part as one solid.
+        The fuse is the slowest stage, so it is stored in the disk cache, keyed
+        by the parameters the part's objects read.
+        """
+        inputs = self.STAGES.inputs("fused")
+        return cached_shape("fused", self._fuse_objects, part=self.LABEL, draft=draft,
+                            inputs={name: getattr(self._parameters, name)
+                                    for name in PARAMETER_FIELDS
+                                    if Parameters.key(name) in inputs})
+
+    def _fuse_objects(self, part, draft, inputs):
+        """Fuses the objects of the part, which has the given label and inputs."""
+        return fuse([self.stage(stage, draft) for stage in self.OBJECTS.values()], part)
+
+    def _thread_placements(self):
+        """
+        Returns the ThreadSpec of each thread object and the height it is moved
+        to, keyed by the object's label.
+        """
+        return {}
+
+    def _build_placed_thread(self, label, draft):
+        """Builds a thread object and moves it into place."""
+        spec, height = self._thread_placements()[label]
+        return trapezoidal_thread(spec, draft=draft).moved(Location((0, 0, height)))
+
+    def estimate(self, settings=PrintSettings(), exact=False):
+        """
+        Estimates the filament and print time of the part without meshing it.
+        The closed-form estimate doesn't touch the CAD kernel, so it is cheap
+        enough to run over thousands of parameter combinations.
+
+        Args:
+            settings (PrintSettings): The slicer settings to assume.
+            exact (bool): Use the volumes of the built B-reps, building any
+                stage that isn't cached, instead of the closed-form volumes.
+
+        Returns:
+            Estimate: The volume, filament, mass and print time of the part.
+        """
+        components = self._components()
+        if exact:
+            components = {label: Component(self.stage(stage).volume, components[label].wall)
+                          for label, stage in self.OBJECTS.items()}
+        return print_estimate(components, self._print_height(), settings)
+
+    def _components(self):
+        """
+        Returns the closed-form Component of each object, keyed by its label.
+        Subclasses add their other objects to the threads.
+        """
+        components = {}
+        for label, (spec, _) in self._thread_placements().items():
+            components[label] = Component(thread_volume(spec), spec.depth)
+        return components
+
+    def _print_height(self):
+        """Returns the height of the part as it is printed."""
+        raise NotImplementedError
+
+    def show(self):
+        """
+        Shows the OCP Cad Viewer Preview
+        """
+        # imported here so batch exports don't load, or need, the viewer
+        from ocp_vscode import show
+        show(self.compound)
+
+    def export_stl(self,file_path,tolerance=.0001,adaptive=False,mesh_threads=False,
+                   fused=False):
+        """
+        Exports as a binary STL file to the given directory, streaming the
+        triangles of one labelled object at a time
+
+        Args:
+            file_path: the path for the STL export
+            tolerance: the level of mesh detail for the STL, defaults to .0001
+            adaptive: ignore tolerance and mesh each feature only as finely as
+                printing needs: threads and the tube path finely, flat faces
+                and the funnel loft coarsely
+            mesh_threads: generate the threads' triangles directly from their
+                profile instead of building and tessellating their B-rep
+            fused: export the part as a single solid, with the threads fused
+                into the body, instead of overlapping objects
+
+        Returns:
+            int: The number of triangles written
+        """
+        return write_stl(file_path, self._export_parts(mesh_threads, fused),
+                         self._mesher(tolerance, adaptive, fused))
+
+    def meshes(self, tolerance=.0001, adaptive=False, mesh_threads=False, fused=False):
+        """
+        Meshes each object of the part and keeps the triangles, for writing the
+        part more than once, e.g. on a build plate.
+
+        Args:
+            tolerance: the level of mesh detail, defaults to .0001
+            adaptive: mesh each feature only as finely as printing needs
+            mesh_threads: generate the threads' triangles from their profile
+            fused: mesh the part as a single solid
+
+        Returns:
+            list: (label, Mesh) for each object
+        """
+        mesher = self._mesher(tolerance, adaptive, fused)
+        meshes = []
+        for label, shape in self._export_parts(mesh_threads, fused):
+            if not isinstance(shape, Mesh):
+                mesher(shape)
+                meshed = triangle_mesh(shape)
+                clear_mesh(shape)
+                shape = meshed
+            meshes.append((label, shape))
+        return meshes
+
+    def _export_parts(self, mesh_threads, fused=False):
+        """
+        Returns the (label, shape) pairs to export, with thread Meshes if
+        mesh_threads, or the single fused solid if fused.
+        """
+        if fused:
+            if mesh_threads:
+                raise ValueError("thread meshes can't be fused into the body")
+            self.validate()
+            return [(self.LABEL, self.stage("fused"))]
+        if not mesh_threads:
+            return labelled_parts(self.build())
+        self.validate()
+        threads = self._thread_placements()
+        return [(label, translated(thread_mesh(threads[label][0]), (0, 0, threads[label][1]))
+                 if label in threads else self.stage(stage))
+                for label, stage in self.OBJECTS.items()]
+
+    def export_3mf(self,file_path,tolerance=.0001,adaptive=False,fused=False):
+        """
+        Exports as a 3MF file to the given directory, with the body and each
+        thread as a separate object
+
+        Args:
+            file_path: the path for the 3MF export
+            tolerance: the level of mesh detail, defaults to .0001
+            adaptive: mesh each feature only as finely as printing needs
+            fused: export the part as a single solid object
+
+        Returns:
+            int: The number of triangles written
+        """
+        return write_3mf(file_path, self._export_parts(False, fused),
+                         self._mesher(tolerance, adaptive, fused))
+
+    def export_step(self,file_path,fused=False):
+        """
+        Exports as a STEP file to the given directory
+
+        Args:
+            file_path: the path for the STEP export
+            fused: export the part as a single solid
+        """
+        if fused:
+            self.validate()
+            shape = self.stage("fused")
+        else:
+            shape = self.build()
+        with span("write step", "export"):
+            export_step(shape, file_path)
+
+    def _mesher(self, tolerance, adaptive, fused=False):
+        """
+        Returns the function meshing each exported object. The threads of a
+        fused part can't be told apart from the body, so adaptive meshing
+        meshes all of it as finely as threads.
+        """
+        if adaptive:
+            bore_radius = (self.tube_outer_diameter+self.tube_outer_tolerance)/2
+            return lambda shape: mesh_features(shape, bore_radius,
+                                               fine=fused or shape.label in self.THREAD_LABELS)
+        return lambda shape: mesh_uniform(shape, tolerance)
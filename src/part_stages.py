@@ -0,0 +1,34 @@
+"""Module listing the build stages of each part, loadable without the CAD libraries."""
+from stage_graph import StageGraph
+
+EXTERNAL_FITTING_STAGES = StageGraph({
+    "connector_thread": ("connector.diameter", "connector.pitch", "connector.depth"),
+    "shaft_thread": ("shaft.diameter", "fitting.pitch", "shaft.length", "fitting.depth",
+                     "shaft.interference", "connector.depth",
+                     "tube.outer_diameter", "tube.outer_tolerance"),
+    "outer_fitting": ("fitting.diameter", "connector.depth", "connector.diameter",
+                      "connector.pitch", "shaft.diameter", "shaft.length", "fitting.depth",
+                      "tube.outer_diameter", "tube.outer_tolerance", "general.font-path"),
+    "compound": ("connector_thread", "shaft_thread", "outer_fitting"),
+    "fused": ("connector_thread", "shaft_thread", "outer_fitting"),
+    })
+
+INTERNAL_FUNNEL_STAGES = StageGraph({
+    "socket_base": ("fitting.hex_diameter", "shaft.diameter", "fitting.tolerance",
+                    "shaft.length", "tube.inner_diameter", "tube.outer_diameter",
+                    "general.font-path"),
+    "bend": ("fitting.hex_diameter", "connector.diameter", "tube.outer_diameter",
+             "tube.outer_tolerance", "bend.angle"),
+    "funnel": ("shaft.diameter", "fitting.depth", "funnel.top_scale",
+               "tube.inner_diameter", "tube.inner_tolerance", "funnel.length"),
+    "thread": ("shaft.diameter", "fitting.tolerance", "fitting.pitch", "shaft.length"),
+    "body": ("socket_base", "bend", "funnel"),
+    "compound": ("body", "thread"),
+    "fused": ("body", "thread"),
+    })
+
+# the stages of each part, keyed by the part names build.py uses
+PART_STAGES = {
+    "external-fitting": EXTERNAL_FITTING_STAGES,
+    "internal-funnel": INTERNAL_FUNNEL_STAGES,
+    }
@@ -0,0 +1,187 @@
+"""Arranges several parts on one build plate and exports them together."""
+import argparse
+import os
+from typing import NamedTuple
+import numpy as np
+from build import CONFIG_SUFFIX, EXTERNAL_FITTING, INTERNAL_FUNNEL, part_class
+from funnel_mesh import translated
+
+DEFAULT_BED = (220.0, 220.0)
+DEFAULT_SPACING = 5.0
+
+
+class Placement(NamedTuple):
+    """Where one copy of a part goes on the plate."""
+    index: int
+    offset: tuple
+
+
+def pack(footprints, bed=DEFAULT_BED, spacing=DEFAULT_SPACING):
+    """
+    Function arranging rectangles on a bed in shelves: the deepest first, left to
+    right, starting a new shelf behind the last when a row is full.
+
+        Parameters:
+            footprints (list): The (width, depth) of each rectangle
+            bed (tuple): The (width, depth) of the bed
+            spacing (float): The gap between rectangles and around the edge of the bed
+
+        Returns:
+            positions (list): The (x, y) of the front left corner of each rectangle
+    """
+    positions = [None]*len(footprints)
+    x = y = spacing
+    shelf_depth = 0
+    for index in sorted(range(len(footprints)), key=lambda index: -footprints[index][1]):
+        width, depth = footprints[index]
+        if x + width + spacing > bed[0] and x > spacing:
+            x, y = spacing, y + shelf_depth + spacing
+            shelf_depth = 0
+        if x + width + spacing > bed[0] or y + depth + spacing > bed[1]:
+            raise ValueError(f"the parts don't fit on a {bed[0]:g}x{bed[1]:g}mm bed")
+        positions[index] = (x, y)
+        x += width + spacing
+        shelf_depth = max(shelf_depth, depth)
+    return positions
+
+
+class Plate:
+    """
+    A build plate of parts. Copies of the same part, with the same parameters,
+    share one mesh, so a plate costs about as much as its distinct parts.
+    """
+    def __init__(self, parts, bed=DEFAULT_BED, spacing=DEFAULT_SPACING, tolerance=.0001,
+                 adaptive=False, mesh_threads=False):
+        """
+        Initialize the plate.
+
+        Args:
+            parts (list): (name, ParametricPart) pairs, one per copy on the plate.
+            bed (tuple): The (width, depth) of the bed in mm.
+            spacing (float): The gap between parts and around the edge of the bed.
+            tolerance: the level of mesh detail, defaults to .0001
+            adaptive: mesh each feature only as finely as printing needs
+            mesh_threads: generate the threads' triangles from their profile
+        """
+        self.bed = bed
+        self.spacing = spacing
+        self.mesh_options = {"tolerance": tolerance, "adaptive": adaptive,
+                             "mesh_threads": mesh_threads}
+        self.unique = []
+        self.copies = []
+        keys = {}
+        for name, part in parts:
+            key = (type(part), part.parameters)
+            if key not in keys:
+                keys[key] = len(self.unique)
+                self.unique.append((name, part))
+            self.copies.append(keys[key])
+        self._meshes = None
+
+    def meshes(self):
+        """
+        Returns the meshes of each distinct part, meshing them the first time.
+
+        Returns:
+            list: (name, [(label, Mesh), ...]) for each distinct part
+        """
+        if self._meshes is None:
+            self._meshes = [(name, part.meshes(**self.mesh_options))
+                            for name, part in self.unique]
+        return self._meshes
+
+    def arrange(self):
+        """
+        Packs the copies onto the bed, resting on it.
+
+        Returns:
+            list: A Placement for each copy
+        """
+        bounds = []
+        for _, parts in self.meshes():
+            vertices = np.concatenate([part_mesh.vertices for _, part_mesh in parts])
+            bounds.append((vertices.min(axis=0), vertices.max(axis=0)))
+        footprints = [tuple(high[:2] - low[:2]) for low, high in
+                      (bounds[index] for index in self.copies)]
+        positions = pack(footprints, self.bed, self.spacing)
+        return [Placement(index, (x - bounds[index][0][0], y - bounds[index][0][1],
+                                  -bounds[index][0][2]))
+                for index, (x, y) in zip(self.copies, positions)]
+
+    def export_3mf(self, file_path):
+        """
+        Exports the plate as a 3MF file. Each distinct part is stored once and
+        every copy is a build item placing it on the plate.
+
+        Args:
+            file_path: the path for the 3MF export
+
+        Returns:
+            int: The number of triangles written, counting each distinct part once
+        """
+        # imported here so packing a plate doesn't need the CAD libraries
+        from mesh_writers import write_3mf_plate
+        return write_3mf_plate(file_path, self.meshes(), self.arrange())
+
+    def export_stl(self, file_path):
+        """
+        Exports the plate as a single binary STL file, with a translated copy of
+        the triangles of each part.
+
+        Args:
+            file_path: the path for the STL export
+
+        Returns:
+            int: The number of triangles written
+        """
+        from mesh_writers import write_stl
+        meshes = self.meshes()
+        parts = [(label, translated(part_mesh, placement.offset))
+                 for placement in self.arrange()
+                 for label, part_mesh in meshes[placement.index][1]]
+        return write_stl(file_path, parts, mesh=None)
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('config_files', nargs='+', metavar='CONFIG',
+                        help='*-settings.ini files of the parts to put on the plate')
+    parser.add_argument('-p', '--part', dest='parts', action='append',
+                        choices=(EXTERNAL_FITTING, INTERNAL_FUNNEL),
+                        help='part to build from each config, may be repeated (default: both)')
+    parser.add_argument('-n', '--copies', type=int, default=1,
+                        help='copies of each part (default: 1)')
+    parser.add_argument('--bed', default=f'{DEFAULT_BED[0]:g}x{DEFAULT_BED[1]:g}',
+                        help='bed width x depth in mm (default: %(default)s)')
+    parser.add_argument('--spacing', type=float, default=DEFAULT_SPACING,
+                        help=f'gap between parts in mm (default: {DEFAULT_SPACING:g})')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='mesh each feature only as finely as printing needs')
+    parser.add_argument('--mesh-threads', action='store_true',
+                        help='generate thread triangles directly from the thread profile')
+    parser.add_argument('-o', '--output', default='plate.3mf',
+                        help='the .3mf or .stl file to write (default: %(default)s)')
+    args = parser.parse_args()
+
+    bed = tuple(float(size) for size in args.bed.lower().split('x'))
+    parts = []
+    for config_file in args.config_files:
+        stem = os.path.basename(config_file)
+        if stem.endswith(CONFIG_SUFFIX):
+            stem = stem[:-len(CONFIG_SUFFIX)]
+        for part in args.parts or (EXTERNAL_FITTING, INTERNAL_FUNNEL):
+            instance = part_class(part)(config_file)
+            parts.extend([(f'{stem}-{part}', instance)]*args.copies)
+    plate = Plate(parts, bed, args.spacing, adaptive=args.adaptive,
+                  mesh_threads=args.mesh_threads)
+    if args.output.lower().endswith('.stl'):
+        triangles = plate.export_stl(args.output)
+    else:
+        triangles = plate.export_3mf(args.output)
+    print(f'{len(parts)} parts ({len(plate.unique)} distinct, {triangles} triangles) '
+          f'-> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
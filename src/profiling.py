@@ -0,0 +1,197 @@
+"""Module providing opt-in timing of build stages, written as Chrome trace files."""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_tracer = None
+
+
+def peak_memory():
+    """
+    Function reading the peak resident memory of this process.
+
+        Returns:
+            megabytes (float): The peak memory in MB, or None where it can't be read
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024*1024 if os.uname().sysname == "Darwin" else 1024)
+
+
+def resident_memory():
+    """
+    Function reading the current resident memory of this process.
+
+        Returns:
+            megabytes (float): The resident memory in MB, or None where it can't be read
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):  # only Linux has /proc
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024*1024)
+
+
+def topology(shape):
+    """
+    Function counting the distinct faces and edges of a shape.
+
+        Parameters:
+            shape (Shape): The shape to count
+
+        Returns:
+            counts (dict): The number of faces and edges
+    """
+    # only needed when tracing, so the stage graphs load without the CAD libraries
+    from OCP.TopAbs import TopAbs_ShapeEnum
+    from OCP.TopExp import TopExp
+    try:
+        from OCP.TopTools import TopTools_IndexedMapOfShape
+    except ImportError:
+        # OCP 8 exposes the OCCT collections under their template names
+        from OCP.collections import (
+            IndexedMap_TopoDS_Shape_TopTools_ShapeMapHasher as TopTools_IndexedMapOfShape)
+    counts = {}
+    for name, shape_type in (("faces", TopAbs_ShapeEnum.TopAbs_FACE),
+                             ("edges", TopAbs_ShapeEnum.TopAbs_EDGE)):
+        found = TopTools_IndexedMapOfShape()
+        TopExp.MapShapes_s(shape.wrapped, shape_type, found)
+        counts[name] = found.Extent()
+    return counts
+
+
+class Tracer:
+    """Records timed spans as Chrome trace "complete" events."""
+    def __init__(self, name):
+        """
+        Initialize an empty trace.
+
+        Args:
+            name (str): The name of the trace, usually the variant being built.
+        """
+        self.name = name
+        self.events = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, category):
+        """
+        Times the body of the with statement.
+
+        Args:
+            name (str): The name of the span.
+            category (str): The kind of work, e.g. "stage" or "tessellation".
+
+        Yields:
+            dict: Arguments recorded with the span, which the body may add to.
+            The change in resident memory over the span is added as rss_delta_mb;
+            the process's peak is only meaningful for the whole trace, so it is
+            written once by write().
+        """
+        arguments = {}
+        start_memory = resident_memory()
+        start = time.perf_counter()
+        try:
+            yield arguments
+        finally:
+            end = time.perf_counter()
+            end_memory = resident_memory()
+            if start_memory is not None and end_memory is not None:
+                arguments["rss_delta_mb"] = round(end_memory - start_memory, 1)
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self._start) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": arguments,
+                })
+
+    def totals(self):
+        """
+        Get the time spent in each span, summed over repeats.
+
+        Returns:
+            dict: Seconds per span name, slowest first.
+        """
+        totals = {}
+        for event in self.events:
+            totals[event["name"]] = totals.get(event["name"], 0) + event["dur"] / 1e6
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def write(self, file_path):
+        """
+        Write the trace as JSON, for chrome://tracing or https://ui.perfetto.dev.
+
+        Args:
+            file_path (str): The path of the trace file.
+        """
+        with open(file_path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": self.events,
+                       "displayTimeUnit": "ms",
+                       "otherData": {"name": self.name, "peak_rss_mb": peak_memory()}},
+                      trace_file, indent=1)
+
+
+@contextmanager
+def tracing(name):
+    """
+    Records every span in the body of the with statement.
+
+    Args:
+        name (str): The name of the trace.
+
+    Yields:
+        Tracer: The trace being recorded.
+    """
+    global _tracer
+    previous, _tracer = _tracer, Tracer(name)
+    try:
+        yield _tracer
+    finally:
+        _tracer = previous
+
+
+@contextmanager
+def span(name, category="stage"):
+    """
+    Times the body of the with statement when a trace is being recorded, and
+    does nothing otherwise.
+
+    Args:
+        name (str): The name of the span.
+        category (str): The kind of work, e.g. "stage" or "tessellation".
+
+    Yields:
+        dict: Arguments recorded with the span, or None when not tracing.
+    """
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.span(name, category) as arguments:
+        yield arguments
+
+
+def record_topology(arguments, shape):
+    """
+    Adds the face and edge counts of a shape to a span's arguments. Counting
+    walks the whole shape, so it is skipped when not tracing.
+
+    Args:
+        arguments (dict): The arguments yielded by span(), or None.
+        shape (Shape): The shape the span produced.
+    """
+    if arguments is not None and hasattr(shape, "wrapped"):
+        arguments.update(topology(shape))
@@ -0,0 +1,118 @@
+"""Module providing binary BREP serialization of built shapes and their label hierarchy."""
+import io
+import json
+import struct
+import build123d
+from OCP.BinTools import BinTools
+from OCP.gp import gp_Trsf
+from OCP.TopLoc import TopLoc_Location
+from OCP.TopoDS import TopoDS_Builder, TopoDS_Compound, TopoDS_Iterator, TopoDS_Shape
+
+FORMAT_MAGIC = b"RBX"
+FORMAT_VERSION = 3
+_HEADER = struct.Struct("<3sBI")
+# the build123d classes a serialized shape may be restored as; other classes,
+# such as bd_warehouse's threads, are stored as the first of these they derive from
+SHAPE_CLASSES = ("Compound", "Part", "Sketch", "Curve", "Solid", "Shell", "Face", "Wire", "Edge")
+
+
+def dumps(shape) -> bytes:
+    """
+    Serializes a shape, with the labels, locations and classes of it and its
+    children, using the OCCT binary BREP format for the geometry.
+
+        Parameters:
+            shape (Shape): The shape to serialize
+
+        Returns:
+            data (bytes): The serialized shape
+    """
+    leaves = []
+    header = json.dumps({"tree": _describe(shape, leaves)}).encode()
+    compound = TopoDS_Compound()
+    builder = TopoDS_Builder()
+    builder.MakeCompound(compound)
+    for leaf in leaves:
+        builder.Add(compound, leaf)
+    brep = io.BytesIO()
+    BinTools.Write_s(compound, brep)
+    return _HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, len(header)) + header + brep.getvalue()
+
+
+def loads(data: bytes):
+    """
+    Restores a shape serialized by dumps().
+
+        Parameters:
+            data (bytes): The serialized shape
+
+        Returns:
+            shape (Shape): The restored shape, with its children
+    """
+    magic, version, header_length = _HEADER.unpack_from(data)
+    if magic != FORMAT_MAGIC or version != FORMAT_VERSION:
+        raise ValueError("unsupported shape serialization format")
+    offset = _HEADER.size
+    header = json.loads(data[offset:offset + header_length])
+    compound = TopoDS_Shape()
+    BinTools.Read_s(compound, io.BytesIO(data[offset + header_length:]))
+    leaves = []
+    iterator = TopoDS_Iterator(compound, False, False)
+    while iterator.More():
+        leaves.append(iterator.Value())
+        iterator.Next()
+    return _restore(header["tree"], leaves)
+
+
+def _describe(shape, leaves):
+    """
+    Describes a shape and its children. The geometry of shapes without
+    children is added to leaves; a shape with children is rebuilt from them,
+    so only its own location is kept.
+    """
+    node = {"label": shape.label, "class": _base_class(type(shape))}
+    children = list(shape.children)
+    if children:
+        node["children"] = [_describe(child, leaves) for child in children]
+        node["location"] = _matrix(shape.wrapped.Location())
+    else:
+        node["leaf"] = len(leaves)
+        leaves.append(shape.wrapped)
+    return node
+
+
+def _base_class(shape_class):
+    """Returns the name of the nearest class in SHAPE_CLASSES a shape class derives from."""
+    for base in shape_class.__mro__:
+        if base.__name__ in SHAPE_CLASSES and getattr(build123d, base.__name__) is base:
+            return base.__name__
+    raise ValueError(f"can't serialize a {shape_class.__name__}")
+
+
+def _restore(node, leaves):
+    """Rebuilds a shape described by _describe()."""
+    shape_class = getattr(build123d, node["class"])
+    if "leaf" in node:
+        shape = shape_class(leaves[node["leaf"]])
+        shape.label = node["label"]
+        return shape
+    children = [_restore(child, leaves) for child in node["children"]]
+    shape = shape_class(label=node["label"], children=children)
+    if node["location"] is not None:
+        shape.wrapped.Location(_location(node["location"]))
+    return shape
+
+
+def _matrix(location):
+    """Returns the rows of a location's transformation, or None for the identity."""
+    if location.IsIdentity():
+        return None
+    transformation = location.Transformation()
+    return [transformation.Value(row, column) for row in (1, 2, 3) for column in (1, 2, 3, 4)]
+
+
+def _location(matrix):
+    """Returns the location with the transformation given by _matrix()."""
+    transformation = gp_Trsf()
+    transformation.SetValues(*matrix)
+    return TopLoc_Location(transformation)
@@ -0,0 +1,353 @@
+"""Serves parts built to order over HTTP, from a pool of workers with the CAD libraries loaded."""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from build import EXTERNAL_FITTING, INTERNAL_FUNNEL, export_part, part_class
+from manifest import input_digest
+from parameters import Parameters
+from part_stages import PART_STAGES
+from sweep import parameter_name
+from validation import InvalidParameters, check
+
+PARTS = (EXTERNAL_FITTING, INTERNAL_FUNNEL)
+CONTENT_TYPES = {'stl': 'model/stl', '3mf': 'model/3mf', 'step': 'model/step'}
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 256
+
+# the part each worker keeps between requests, so a request that only
+# changes a few parameters only rebuilds the stages reading them
+_parts = {}
+
+
+def warm():
+    """Loads the CAD libraries and part modules in a new worker, before any request needs them."""
+    # bd_warehouse is otherwise loaded by the first thread built
+    from bd_warehouse.thread import TrapezoidalThread  # pylint: disable=unused-import
+    for part in PARTS:
+        part_class(part)
+
+
+def _ready():
+    """Returns the worker's pid once its initializer has run."""
+    return os.getpid()
+
+
+def render(part, parameters, file_format, adaptive=False, mesh_threads=False, fused=False):
+    """
+    Builds a part and exports it, in a worker process.
+
+    Args:
+        part (str): EXTERNAL_FITTING or INTERNAL_FUNNEL.
+        parameters (Parameters): The parameters of the part.
+        file_format (str): 'stl', '3mf' or 'step'.
+        adaptive (bool): Mesh with per-feature tolerances.
+        mesh_threads (bool): Generate STL threads directly from their profile.
+        fused (bool): Export the part as one solid.
+
+    Returns:
+        bytes: The exported file.
+    """
+    instance = _parts.get(part)
+    if instance is None:
+        instance = _parts[part] = part_class(part)(parameters=parameters)
+    else:
+        instance.parameters = parameters
+    with tempfile.TemporaryDirectory() as directory:
+        export_part(instance, part, directory, (file_format,), adaptive, mesh_threads, fused)
+        with open(os.path.join(directory, f'{part}.{file_format}'), 'rb') as export_file:
+            return export_file.read()
+
+
+class ResultCache:
+    """The most recently used exports, up to a total size in bytes."""
+    def __init__(self, max_bytes):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes (int): The most the cached exports may add up to.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Get a cached export, marking it as recently used.
+
+        Args:
+            key (str): The digest of the export's inputs.
+
+        Returns:
+            bytes: The export, or None if it isn't cached.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """
+        Cache an export, evicting the least recently used ones to make room.
+
+        Args:
+            key (str): The digest of the export's inputs.
+            data (bytes): The export.
+        """
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class BuildService:
+    """
+    Builds parts on request in a pool of warm worker processes. Results are
+    cached by a digest of their inputs, and concurrent requests for the same
+    part share one build.
+    """
+    def __init__(self, base=None, jobs=None, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Initialize the service and start its workers.
+
+        Args:
+            base (Parameters): The values of parameters a request doesn't set;
+                the defaults if None.
+            jobs (int): The number of worker processes, one per core by default.
+            cache_size (float): The size of the result cache in MB.
+        """
+        self.base = base or Parameters()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=warm)
+        self.cache = ResultCache(int(cache_size*2**20))
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Waits until the workers have started and loaded the CAD libraries."""
+        futures = [self.pool.submit(_ready) for _ in range(self.jobs)]
+        for future in futures:
+            future.result()
+
+    def parameters(self, values):
+        """
+        Resolve the parameters of a request.
+
+        Args:
+            values (dict): Parameter values keyed by name or ini key, e.g.
+                "tube_outer_diameter" or "tube.outer_diameter".
+
+        Returns:
+            Parameters: The base parameters with the values applied.
+        """
+        return self.base.replace(**{parameter_name(key): value for key, value in values.items()})
+
+    def request(self, part, parameters, file_format, adaptive=False, mesh_threads=False,
+                fused=False):
+        """
+        Get an export of a part, from the cache or built by a worker.
+
+        Args:
+            part (str): EXTERNAL_FITTING or INTERNAL_FUNNEL.
+            parameters (Parameters): The parameters of the part.
+            file_format (str): 'stl', '3mf' or 'step'.
+            adaptive (bool): Mesh with per-feature tolerances.
+            mesh_threads (bool): Generate STL threads directly from their profile.
+            fused (bool): Export the part as one solid.
+
+        Returns:
+            tuple: The exported bytes and whether they came from the cache.
+
+        Raises:
+            InvalidParameters: If the part can't be built from the parameters.
+        """
+        violations = check(parameters, PART_STAGES[part].stages)
+        if violations:
+            raise InvalidParameters(violations)
+        options = {'adaptive': adaptive, 'mesh_threads': mesh_threads}
+        if fused:
+            options['fused'] = True
+        key = input_digest(part, parameters, file_format, options)
+        data = self.cache.get(key)
+        if data is not None:
+            return data, True
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = self.pool.submit(
+                    render, part, parameters, file_format, adaptive, mesh_threads, fused)
+        try:
+            data = future.result()
+            if owner:
+                self.cache.put(key, data)
+        finally:
+            if owner:
+                with self._lock:
+                    del self._pending[key]
+        return data, False
+
+    def shutdown(self):
+        """Stops the workers."""
+        self.pool.shutdown(cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Handles `POST /<part>.<format>` with a JSON object of parameters, e.g.
+    `POST /internal-funnel.stl?adaptive=1` with `{"tube.inner_diameter": 2}`,
+    and `GET /health`.
+    """
+    server_version = 'repbox-funnel'
+
+    def address_string(self):
+        """Returns the client's address; Unix socket clients have none."""
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def _reply(self, status, body, content_type='application/json', headers=None):
+        """Sends a response."""
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Reports whether the service is up."""
+        service = self.server.service
+        if urlsplit(self.path).path != '/health':
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, {"workers": service.jobs, "cached": len(service.cache),
+                          "cache_bytes": service.cache.size})
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Builds, or fetches from the cache, the requested export."""
+        service = self.server.service
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        url = urlsplit(self.path)
+        part, _, file_format = url.path.strip('/').rpartition('.')
+        if part not in PARTS or file_format not in CONTENT_TYPES:
+            self._reply(404, {"error": f"expected /<{'|'.join(PARTS)}>.<"
+                                       f"{'|'.join(CONTENT_TYPES)}>"})
+            return
+        query = parse_qs(url.query)
+        flags = {name: query.get(name, ['0'])[-1].lower() in ('1', 'true', 'yes')
+                 for name in ('adaptive', 'mesh_threads', 'fused')}
+        try:
+            values = json.loads(body or b'{}')
+            if not isinstance(values, dict):
+                raise ValueError("the body must be a JSON object of parameters")
+            parameters = service.parameters(values)
+            data, hit = service.request(part, parameters, file_format, **flags)
+        except InvalidParameters as error:
+            self._reply(422, {"error": str(error),
+                              "violations": [violation._asdict()
+                                             for violation in error.violations]})
+        except (ValueError, TypeError) as error:
+            self._reply(400, {"error": str(error)})
+        except Exception as error:  # pylint: disable=broad-except
+            self._reply(500, {"error": f"{type(error).__name__}: {error}"})
+        else:
+            self._reply(200, data, CONTENT_TYPES[file_format],
+                        {"X-Cache": "hit" if hit else "miss",
+                         "Content-Disposition": f'attachment; filename="{part}.{file_format}"'})
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    """A threaded HTTP server listening on a Unix socket."""
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        """Binds the socket, replacing a socket file left by an earlier run."""
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0
+
+    def server_close(self):
+        """Closes the socket and removes its file."""
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """
+    Serves requests until interrupted.
+
+    Args:
+        service (BuildService): The service building the parts.
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        socket_path (str): Listen on this Unix socket instead of a port.
+    """
+    if socket_path:
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.service = service
+    print(f'serving on {socket_path or f"http://{host}:{port}"}, press Ctrl+C to stop')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--config', metavar='CONFIG',
+                        help='*-settings.ini file giving the values of parameters a request '
+                             "doesn't set (default: the built-in defaults)")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='port to listen on (default: %(default)s)')
+    parser.add_argument('--socket', dest='socket_path', metavar='PATH',
+                        help='listen on a Unix socket instead of a port')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE,
+                        help='MB of recent results to keep (default: %(default)s)')
+    args = parser.parse_args()
+
+    base = Parameters.from_file(args.config) if args.config else None
+    service = BuildService(base, args.jobs, args.cache_size)
+    try:
+        service.start()
+        serve(service, args.host, args.port, args.socket_path)
+    finally:
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Module providing incremental rebuilds of parts assembled from named stages."""
+from profiling import span, record_topology
+
+
+class StageGraph:
+    """
+    Records what each build stage reads. An input is either a config key,
+    written as "section.option", or the name of another stage.
+    """
+    def __init__(self, stages):
+        """
+        Initialize the graph.
+
+        Args:
+            stages (dict): Maps each stage name to the inputs it reads.
+        """
+        self.stages = {name: frozenset(inputs) for name, inputs in stages.items()}
+        self._affected = {}
+        self._inputs = {}
+
+    def affected(self, key):
+        """
+        Get the stages that must be rebuilt when an input changes.
+
+        Args:
+            key (str): A config key or stage name.
+
+        Returns:
+            frozenset: Every stage that reads the input directly or through
+            another stage.
+        """
+        if key not in self._affected:
+            affected = set()
+            pending = [key]
+            while pending:
+                changed = pending.pop()
+                for name, inputs in self.stages.items():
+                    if changed in inputs and name not in affected:
+                        affected.add(name)
+                        pending.append(name)
+            self._affected[key] = frozenset(affected)
+        return self._affected[key]
+
+    def inputs(self, stage):
+        """
+        Get the config keys a stage depends on.
+
+        Args:
+            stage (str): The name of the stage.
+
+        Returns:
+            frozenset: Every config key the stage reads directly or through
+            another stage.
+        """
+        if stage not in self._inputs:
+            keys = set()
+            for name in self.stages[stage]:
+                keys.update(self.inputs(name) if name in self.stages else (name,))
+            self._inputs[stage] = frozenset(keys)
+        return self._inputs[stage]
+
+
+class StageCache:
+    """Holds the results of the stages of a StageGraph until their inputs change."""
+    def __init__(self, graph):
+        """
+        Initialize an empty cache.
+
+        Args:
+            graph (StageGraph): The stages and the inputs they read.
+        """
+        self.graph = graph
+        self.results = {}
+
+    def get(self, stage, build):
+        """
+        Get the result of a stage, building it if it isn't cached. Builds are
+        timed when a trace is being recorded.
+
+        Args:
+            stage (str): The name of the stage.
+            build (callable): Builds the stage when there is no cached result.
+        """
+        if stage not in self.graph.stages:
+            raise KeyError(f"unknown stage '{stage}'")
+        if stage not in self.results:
+            with span(stage) as arguments:
+                self.results[stage] = build()
+                record_topology(arguments, self.results[stage])
+        return self.results[stage]
+
+    def put(self, stage, result):
+        """
+        Store a result built elsewhere, discarding the stages that read it.
+
+        Args:
+            stage (str): The name of the stage.
+            result: The result of the stage.
+        """
+        if stage not in self.graph.stages:
+            raise KeyError(f"unknown stage '{stage}'")
+        self.invalidate(stage)
+        self.results[stage] = result
+
+    def invalidate(self, key):
+        """
+        Discard the stages affected by a changed input.
+
+        Args:
+            key (str): A config key or stage name.
+        """
+        for stage in self.graph.affected(key):
+            self.results.pop(stage, None)
+
+    def clear(self):
+        """Discard every cached stage."""
+        self.results.clear()
+
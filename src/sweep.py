@@ -0,0 +1,258 @@
+"""Builds a grid of part variants with parameters swept over ranges of values."""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from build import (DEFAULT_OUTPUT_DIRECTORY, CONFIG_SUFFIX, EXTERNAL_FITTING, INTERNAL_FUNNEL,
+                   Variant, build_all, part_class, report_invalid, split_invalid)
+from estimate import PrintSettings
+from parameters import Parameters, KEYS, PARAMETER_FIELDS, coerce
+from part_stages import PART_STAGES
+
+PARTS = (EXTERNAL_FITTING, INTERNAL_FUNNEL)
+_NAMES = {key: name for name, key in KEYS.items()}
+
+
+def parameter_name(key):
+    """
+    Get the name of a parameter from its name or its ini key.
+
+    Args:
+        key (str): A parameter name, e.g. "fitting_tolerance", or an ini key,
+            e.g. "fitting.tolerance".
+
+    Returns:
+        str: The parameter name.
+    """
+    name = _NAMES.get(key, key)
+    if name not in PARAMETER_FIELDS:
+        raise ValueError(f"unknown parameter '{key}'")
+    return name
+
+
+def parse_axis(text):
+    """
+    Parse one swept parameter from the command line.
+
+    Args:
+        text (str): `key=start:stop:count` for count evenly spaced values from
+            start to stop inclusive, or `key=value,value,...`.
+
+    Returns:
+        tuple: The parameter name and the list of values.
+    """
+    key, _, values = text.partition('=')
+    name = parameter_name(key.strip())
+    if ':' in values:
+        start, stop, count = values.split(':')
+        start, stop, count = float(start), float(stop), int(count)
+        if count < 1:
+            raise ValueError(f"'{text}' must sweep at least one value")
+        step = (stop - start) / (count - 1) if count > 1 else 0
+        return name, [round(start + step * index, 9) for index in range(count)]
+    return name, [coerce(name, value.strip()) for value in values.split(',') if value.strip()]
+
+
+def expand(base, axes):
+    """
+    Expand swept parameters into every combination of their values.
+
+    Args:
+        base (Parameters): The parameters that aren't swept.
+        axes (list): (name, values) pairs, see parse_axis().
+
+    Returns:
+        list: (point, Parameters) pairs, where point maps each swept name to
+        its value.
+    """
+    names = [name for name, _ in axes]
+    grid = []
+    for values in itertools.product(*(values for _, values in axes)):
+        point = dict(zip(names, values))
+        grid.append((point, base.replace(**point)))
+    return grid
+
+
+def _reads(part, name):
+    """Returns whether any stage of a part reads a parameter."""
+    return KEYS[name] in PART_STAGES[part].inputs("compound")
+
+
+def _label(value):
+    """Formats a swept value for a file name."""
+    return f'{value:g}' if isinstance(value, float) else str(value).replace(os.sep, '_')
+
+
+def sweep_variants(config_file, axes, parts=PARTS):
+    """
+    Lists the variants of a sweep. A part that doesn't read a swept parameter
+    would come out the same for each of its values, so it is only built once
+    per combination of the parameters it does read.
+
+    Args:
+        config_file (str): The configuration file the sweep starts from.
+        axes (list): (name, values) pairs, see parse_axis().
+        parts (tuple): The parts to build.
+
+    Returns:
+        list: The variants to build, each with its parameters resolved.
+    """
+    stem = os.path.basename(config_file)
+    if stem.endswith(CONFIG_SUFFIX):
+        stem = stem[:-len(CONFIG_SUFFIX)]
+    base = Parameters.from_file(config_file)
+    variants = []
+    for part in parts:
+        names = set()
+        for point, parameters in expand(base, axes):
+            read = [(name, value) for name, value in point.items() if _reads(part, name)]
+            name = '-'.join([stem, part] + [f'{key}{_label(value)}' for key, value in read])
+            if name not in names:
+                names.add(name)
+                variants.append(Variant(part, None, name, parameters))
+    return variants
+
+
+def shared_stages(variants):
+    """
+    Lists the disk cached stages needed by a set of variants, once for each
+    distinct set of inputs.
+
+    Args:
+        variants (list): The variants to build.
+
+    Returns:
+        list: (part, parameters, stage) for one variant needing each distinct
+        stage.
+    """
+    found = {}
+    for variant in variants:
+        part = part_class(variant.part)
+        for stage in part.CACHED_STAGES:
+            inputs = tuple(sorted((key, getattr(variant.parameters, _NAMES[key]))
+                                  for key in part.STAGES.inputs(stage)))
+            found.setdefault((variant.part, stage, inputs),
+                             (variant.part, variant.parameters, stage))
+    return list(found.values())
+
+
+def build_stage(part, parameters, stage):
+    """
+    Builds one stage of a part, storing its geometry in the disk cache.
+
+    Args:
+        part (str): EXTERNAL_FITTING or INTERNAL_FUNNEL.
+        parameters (Parameters): The parameters of the part.
+        stage (str): The stage to build.
+
+    Returns:
+        str: The stage.
+    """
+    part_class(part)(parameters=parameters).stage(stage)
+    return stage
+
+
+def warm(variants, jobs=None):
+    """
+    Builds each distinct shared stage of the variants once, in parallel, so
+    that building the variants themselves only reads those stages from the
+    disk cache instead of every worker building them again.
+
+    Args:
+        variants (list): The variants that will be built.
+        jobs (int): The number of worker processes; 1 builds in this process.
+
+    Returns:
+        int: The number of stages built.
+    """
+    import geometry_cache
+    if not geometry_cache.enabled:
+        return 0
+    stages = shared_stages(variants)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for stage in stages:
+            build_stage(*stage)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(stages) or 1)) as pool:
+            list(pool.map(build_stage, *zip(*stages)))
+    return len(stages)
+
+
+def estimate_variants(variants, settings=PrintSettings()):
+    """
+    Estimates the filament and print time of each variant from closed-form
+    volumes, without building any geometry.
+
+    Args:
+        variants (list): The variants of a sweep.
+        settings (PrintSettings): The slicer settings to assume.
+
+    Returns:
+        dict: The Estimate of each variant, keyed by its name.
+    """
+    return {variant.name: part_class(variant.part)(parameters=variant.parameters)
+            .estimate(settings)
+            for variant in variants}
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('config_file', help='the *-settings.ini file the sweep starts from')
+    parser.add_argument('--vary', dest='axes', action='append', type=parse_axis, required=True,
+                        metavar='KEY=START:STOP:COUNT|KEY=V1,V2,...',
+                        help='a parameter to sweep, by name or section.option; may be repeated')
+    parser.add_argument('-p', '--part', dest='parts', action='append', choices=PARTS,
+                        help='part to build, may be repeated (default: both)')
+    parser.add_argument('-o', '--output-directory', default=DEFAULT_OUTPUT_DIRECTORY)
+    parser.add_argument('-f', '--format', dest='formats', action='append',
+                        choices=('stl', '3mf', 'step'),
+                        help='export format, may be repeated (default: stl)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='mesh STL and 3MF exports with per-feature tolerances')
+    parser.add_argument('--estimate', action='store_true',
+                        help="estimate each variant's mass and print time instead of building it")
+    parser.add_argument('--layer-height', type=float, default=PrintSettings().layer_height,
+                        help='layer height the estimates assume (default: %(default)s)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    variants, invalid = split_invalid(
+        sweep_variants(args.config_file, args.axes, tuple(args.parts or PARTS)))
+    report_invalid(invalid)
+    if args.estimate:
+        estimates = estimate_variants(variants, PrintSettings(layer_height=args.layer_height))
+        for name, estimate in estimates.items():
+            print(f'{name}: {estimate.mass:.1f}g, {estimate.print_time/60:.0f}min')
+        os.makedirs(args.output_directory, exist_ok=True)
+        with open(os.path.join(args.output_directory, 'sweep.json'), 'w',
+                  encoding='utf-8') as sweep_file:
+            json.dump({variant.name: {"part": variant.part,
+                                      "parameters": {name: getattr(variant.parameters, name)
+                                                     for name, _ in args.axes},
+                                      "estimate": estimates[variant.name]._asdict()}
+                       for variant in variants}, sweep_file, indent=2)
+        print(f'estimated {len(variants)} variants in {time.perf_counter() - start:.2f}s')
+        return
+    shared = warm(variants, args.jobs)
+    print(f'built {shared} shared stages in {time.perf_counter() - start:.1f}s')
+    for variant, outputs, duration, _ in build_all(variants, args.output_directory,
+                                                   tuple(args.formats or ('stl',)),
+                                                   args.jobs, adaptive=args.adaptive):
+        print(f'{variant.name}: {duration:.1f}s -> {", ".join(outputs)}')
+    with open(os.path.join(args.output_directory, 'sweep.json'), 'w',
+              encoding='utf-8') as sweep_file:
+        json.dump({variant.name: {"part": variant.part,
+                                  "parameters": {name: getattr(variant.parameters, name)
+                                                 for name, _ in args.axes}}
+                   for variant in variants}, sweep_file, indent=2)
+    print(f'built {len(variants)} variants in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
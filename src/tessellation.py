@@ -0,0 +1,137 @@
+"""Module providing feature aware meshing of parts for STL export."""
+from typing import NamedTuple
+from OCP.BRep import BRep_Tool
+from OCP.BRepAdaptor import BRepAdaptor_Surface
+from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.BRepTools import BRepTools
+from OCP.GeomAbs import GeomAbs_SurfaceType
+from OCP.TopAbs import TopAbs_ShapeEnum
+from OCP.TopExp import TopExp_Explorer
+from OCP.TopLoc import TopLoc_Location
+from OCP.TopoDS import TopoDS
+
+# OCP 8 binds OCCT's static methods without the _s suffix
+_as_face = getattr(TopoDS, "Face_s", None) or TopoDS.Face
+
+
+class Deflection(NamedTuple):
+    """The chordal (mm) and angular (radians) deflection allowed when meshing a face."""
+    linear: float
+    angular: float
+
+
+# FDM nozzles lay down ~0.4mm lines at >= 0.05mm layers, so nothing here needs
+# to be finer than a few microns.
+THREAD = Deflection(0.005, 0.1)
+BORE = Deflection(0.005, 0.1)
+CURVED = Deflection(0.02, 0.2)
+COARSE = Deflection(0.05, 0.5)
+
+
+def faces(shape):
+    """
+    Function listing the faces of a shape.
+
+        Parameters:
+            shape (TopoDS_Shape): The shape to explore
+
+        Returns:
+            faces (list): The TopoDS_Face objects of the shape
+    """
+    found = []
+    explorer = TopExp_Explorer(shape, TopAbs_ShapeEnum.TopAbs_FACE)
+    while explorer.More():
+        found.append(_as_face(explorer.Current()))
+        explorer.Next()
+    return found
+
+
+def face_deflection(face, bore_radius):
+    """
+    Function choosing the deflection for a face of the body of a part.
+
+        Parameters:
+            face (TopoDS_Face): The face to mesh
+            bore_radius (float): Round faces up to this radius are part of the tube or
+                filament path and are meshed finely
+
+        Returns:
+            deflection (Deflection): The deflection to mesh the face with
+    """
+    surface = BRepAdaptor_Surface(face)
+    surface_type = surface.GetType()
+    if surface_type == GeomAbs_SurfaceType.GeomAbs_Cylinder:
+        radius = surface.Cylinder().Radius()
+    elif surface_type == GeomAbs_SurfaceType.GeomAbs_Cone:
+        radius = surface.Cone().RefRadius()
+    elif surface_type == GeomAbs_SurfaceType.GeomAbs_Torus:
+        radius = surface.Torus().MinorRadius()
+    else:
+        return COARSE
+    return BORE if radius <= bore_radius * (1 + 1e-6) else CURVED
+
+
+def clear_mesh(shape):
+    """Removes any triangulation stored on a build123d shape."""
+    BRepTools.Clean_s(shape.wrapped)
+
+
+def mesh_uniform(shape, tolerance, angular_tolerance=0.1):
+    """
+    Function meshing a shape with a single tolerance relative to the size of
+    each edge, as build123d's export_stl does.
+
+        Parameters:
+            shape (Shape): The shape to mesh
+            tolerance (float): The relative chordal deflection
+            angular_tolerance (float): The angular deflection in radians
+    """
+    clear_mesh(shape)
+    BRepMesh_IncrementalMesh(shape.wrapped, tolerance, True, angular_tolerance, True)
+
+
+def mesh_features(shape, bore_radius, fine=False):
+    """
+    Function meshing a shape with a deflection chosen per face: the tube path
+    finely, other round faces moderately and flat faces and lofts coarsely.
+    Finer faces are meshed first so the coarser passes reuse their edge
+    discretization and the mesh stays watertight.
+
+        Parameters:
+            shape (Shape): The shape to mesh
+            bore_radius (float): See face_deflection()
+            fine (bool): Mesh every face with THREAD deflection
+    """
+    clear_mesh(shape)
+    if fine:
+        _mesh(shape.wrapped, THREAD)
+        return
+    for deflection in (BORE, CURVED):
+        for face in faces(shape.wrapped):
+            if face_deflection(face, bore_radius) == deflection:
+                _mesh(face, deflection)
+    _mesh(shape.wrapped, COARSE)
+
+
+def _mesh(shape, deflection):
+    """Meshes a TopoDS_Shape, keeping any existing finer triangulation."""
+    BRepMesh_IncrementalMesh(shape, deflection.linear, False, deflection.angular, True)
+
+
+def triangle_count(shape):
+    """
+    Function counting the triangles of a meshed shape.
+
+        Parameters:
+            shape (Shape): The meshed shape
+
+        Returns:
+            triangles (int): The number of triangles over all faces
+    """
+    count = 0
+    for face in faces(shape.wrapped):
+        triangulation = BRep_Tool.Triangulation_s(face, TopLoc_Location())
+        if triangulation is not None:
+            count += triangulation.NbTriangles()
+    return count
+
@@ -0,0 +1,124 @@
+"""Module providing triangle meshes of the trapezoidal threads, generated without the CAD kernel."""
+from math import radians, tan, pi, acos, ceil
+import numpy as np
+from funnel_mesh import Mesh, mesh_volume
+from threads import DEFAULT_INTERFERENCE, THREAD_ANGLE, trapezoidal_thread
+
+DEFAULT_TOLERANCE = 0.005
+# the end finishes bd_warehouse's TrapezoidalThread uses when a ThreadSpec leaves them unset
+DEFAULT_END_FINISHES = ("fade", "fade")
+FADE_ANGLE = pi/2
+
+
+def thread_profile(spec):
+    """
+    Function computing the cross section of a thread's tooth in the plane of its axis.
+
+        Parameters:
+            spec (ThreadSpec): The thread
+
+        Returns:
+            profile (tuple): The core radius (the root extended by the interference),
+                the root and apex radii, and the axial widths of the tooth at its root
+                and apex
+    """
+    flank = spec.depth*tan(radians(THREAD_ANGLE/2))
+    interference = DEFAULT_INTERFERENCE if spec.interference is None else spec.interference
+    if spec.external:
+        apex_radius = spec.diameter/2
+        root_radius = apex_radius - spec.depth
+        core_radius = root_radius - interference
+    else:
+        root_radius = spec.diameter/2
+        apex_radius = root_radius - spec.depth
+        core_radius = root_radius + interference
+    return core_radius, root_radius, apex_radius, spec.pitch/2 + flank, spec.pitch/2 - flank
+
+
+def thread_mesh(spec, tolerance=DEFAULT_TOLERANCE):
+    """
+    Function generating a mesh of the thread built by threads.trapezoidal_thread by
+    sweeping the tooth profile along the helix.
+
+    The end finishes are approximated: "square" ends are clamped flat at the end
+    planes, "chamfer" ends are also cut back at 45 degrees from the root, "fade"
+    ends shrink the tooth into the root over the last quarter turn and "raw" ends
+    stop with the full profile.
+
+        Parameters:
+            spec (ThreadSpec): The thread
+            tolerance (float): The largest distance of the mesh from the helix
+
+        Returns:
+            mesh (Mesh): A watertight mesh of the thread, starting at z=0
+    """
+    core_radius, root_radius, apex_radius, root_width, apex_width = thread_profile(spec)
+    finishes = spec.end_finishes or DEFAULT_END_FINISHES
+    half_width = root_width/2
+    offsets = {"square": -half_width, "chamfer": -half_width, "fade": half_width, "raw": 0}
+    start = offsets[finishes[0]]
+    end = spec.length - offsets[finishes[1]]
+    sweep = 2*pi*(end - start)/spec.pitch
+    step = 2*acos(1 - min(tolerance/apex_radius, 1))
+    angles = np.linspace(0, sweep, max(2, ceil(sweep/step) + 1))
+    centers = start + spec.pitch*angles/(2*pi)
+
+    fade = np.ones_like(angles)
+    if finishes[0] == "fade":
+        fade = np.minimum(fade, angles/FADE_ANGLE)
+    if finishes[1] == "fade":
+        fade = np.minimum(fade, (sweep - angles)/FADE_ANGLE)
+    fade = np.clip(fade, 0, 1)[:, None]
+    tooth_radius = root_radius + fade*(apex_radius - root_radius)
+    tooth_width = root_width + fade*(apex_width - root_width)
+    ones = np.ones_like(fade)
+    radii = np.hstack((core_radius*ones, root_radius*ones, tooth_radius, tooth_radius,
+                       root_radius*ones, core_radius*ones))
+    heights = centers[:, None] + np.hstack((-half_width*ones, -half_width*ones, -tooth_width/2,
+                                            tooth_width/2, half_width*ones, half_width*ones))
+
+    for finish, plane, inward in ((finishes[0], 0.0, 1), (finishes[1], spec.length, -1)):
+        if finish not in ("square", "chamfer"):
+            continue
+        heights = np.maximum(heights, plane) if inward > 0 else np.minimum(heights, plane)
+        if finish == "chamfer":
+            distance = (heights - plane)*inward
+            if spec.external:
+                radii = np.minimum(radii, root_radius + distance)
+            else:
+                radii = np.maximum(radii, root_radius - distance)
+
+    vertices = np.stack((radii*np.cos(angles)[:, None], radii*np.sin(angles)[:, None], heights),
+                        axis=-1).reshape(-1, 3)
+    samples, corners = radii.shape
+    along = np.arange(samples - 1)[:, None]
+    around = np.arange(corners)[None, :]
+    first = (along*corners + around).ravel()
+    next_around = (along*corners + (around + 1) % corners).ravel()
+    next_along = first + corners
+    diagonal = next_around + corners
+    fan = np.arange(1, corners - 1)
+    caps = [np.stack((np.zeros_like(fan), fan, fan + 1), axis=1),
+            (samples - 1)*corners + np.stack((np.zeros_like(fan), fan + 1, fan), axis=1)]
+    triangles = np.concatenate([np.stack((first, next_along, diagonal), axis=1),
+                                np.stack((first, diagonal, next_around), axis=1)] + caps)
+    mesh = Mesh(vertices, triangles)
+    if mesh_volume(mesh) < 0:
+        mesh = Mesh(vertices, triangles[:, ::-1].copy())
+    return mesh
+
+
+def volume_error(spec, tolerance=DEFAULT_TOLERANCE):
+    """
+    Function comparing the volume of a thread's mesh with its B-rep, for checking
+    the mesh after a change to either builder.
+
+        Parameters:
+            spec (ThreadSpec): The thread
+            tolerance (float): The largest distance of the mesh from the helix
+
+        Returns:
+            error (float): The relative difference of the mesh volume from the B-rep's
+    """
+    expected = trapezoidal_thread(spec).volume
+    return (mesh_volume(thread_mesh(spec, tolerance)) - expected)/expected
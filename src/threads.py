@@ -0,0 +1,83 @@
+"""Module providing the trapezoidal threads used by the fittings and funnels."""
+from typing import NamedTuple
+
+THREAD_ANGLE = 30.0
+# the interference bd_warehouse's TrapezoidalThread uses when a ThreadSpec leaves it unset
+DEFAULT_INTERFERENCE = 0.2
+
+
+class ThreadSpec(NamedTuple):
+    """The parameters of a right handed trapezoidal thread."""
+    diameter: float
+    pitch: float
+    length: float
+    external: bool
+    interference: float = None
+    end_finishes: tuple = None
+
+    @property
+    def depth(self):
+        """The radial depth of the thread profile."""
+        return self.pitch/2
+
+
+def trapezoidal_thread(spec, draft=False):
+    """
+    Function generating a trapezoidal thread.
+
+        Parameters:
+            spec (ThreadSpec): The thread to build
+            draft (bool): Return a plain tube with the thread's envelope instead
+
+        Returns:
+            thread (Part): The thread, starting at z=0
+    """
+    if draft:
+        return thread_proxy(spec)
+    # the CAD libraries are only loaded once a real thread is needed, so thread
+    # profiles and meshes can be computed without them
+    from bd_warehouse.thread import TrapezoidalThread
+    from geometry_cache import cached_shape
+    params = {
+        "diameter": spec.diameter,
+        "pitch": spec.pitch,
+        "length": spec.length,
+        "thread_angle": THREAD_ANGLE,
+        "external": spec.external,
+        "hand": "right",
+        # bd_warehouse's own frame: on the axis from z=0 to z=length, like the
+        # proxy and the thread meshes. Aligning on the bounding box instead would
+        # move faded and raw ends, whose tips reach past the end planes.
+        "align": None,
+    }
+    if spec.interference is not None:
+        params["interference"] = spec.interference
+    if spec.end_finishes is not None:
+        params["end_finishes"] = spec.end_finishes
+    return cached_shape("trapezoidal_thread", TrapezoidalThread, **params)
+
+
+def thread_proxy(spec):
+    """
+    Function generating a tube occupying the same envelope as a thread, for
+    fast previews.
+
+        Parameters:
+            spec (ThreadSpec): The thread to stand in for
+
+        Returns:
+            proxy (Part): The tube, starting at z=0
+    """
+    from build123d import BuildPart, Cylinder, Align, Mode
+    interference = DEFAULT_INTERFERENCE if spec.interference is None else spec.interference
+    outer_radius = spec.diameter/2
+    inner_radius = outer_radius - spec.depth
+    if spec.external:
+        inner_radius -= interference
+    else:
+        outer_radius += interference
+    align = (Align.CENTER, Align.CENTER, Align.MIN)
+    with BuildPart() as proxy:
+        Cylinder(radius=outer_radius, height=spec.length, align=align)
+        Cylinder(radius=inner_radius, height=spec.length, align=align, mode=Mode.SUBTRACT)
+    return proxy.part
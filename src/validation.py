@@ -0,0 +1,156 @@
+"""Module checking that parameters describe buildable geometry before anything is built."""
+from math import sqrt
+from typing import Callable, NamedTuple
+from funnel_mesh import FUNNEL_RIM_WALL
+from parameters import KEYS
+from threads import DEFAULT_INTERFERENCE as THREAD_INTERFERENCE
+
+# the thinnest wall that still prints as two perimeters
+MINIMUM_WALL = 0.8
+
+
+class Violation(NamedTuple):
+    """A constraint the parameters break and the ini keys involved."""
+    message: str
+    keys: tuple
+
+
+class Constraint(NamedTuple):
+    """
+    A clearance a stage needs. margin returns the clearance, in unit, for the
+    given Parameters, which must be positive for the stage to be built.
+    """
+    stage: str
+    names: tuple
+    message: str
+    margin: Callable
+    unit: str = "mm"
+
+
+class InvalidParameters(ValueError):
+    """Raised when parameters break one or more constraints."""
+    def __init__(self, violations):
+        """
+        Initialize the error.
+
+        Args:
+            violations (list): The Violations found.
+        """
+        super().__init__("; ".join(violation.message for violation in violations))
+        self.violations = violations
+
+
+def _tube_radius(p):
+    """The radius of the PTFE tube path."""
+    return (p.tube_outer_diameter + p.tube_outer_tolerance)/2
+
+
+def _chamfer(p):
+    """The chamfer at the top of the external fitting's shaft."""
+    return (p.shaft_diameter - (p.tube_outer_diameter + p.tube_outer_tolerance))/8
+
+
+def _funnel_radii(p):
+    """The lower and upper vertex radii of the funnel's hexagon."""
+    lower = p.shaft_diameter/2 + p.fitting_depth
+    return lower, lower*p.funnel_top_scale
+
+
+CONSTRAINTS = (
+    Constraint("connector_thread", ("connector_pitch",),
+               "the connector thread needs a pitch", lambda p: p.connector_pitch),
+    Constraint("connector_thread", ("connector_depth", "connector_pitch"),
+               "the connector is shallower than half its pitch",
+               lambda p: p.connector_depth - p.connector_pitch/2),
+    Constraint("outer_fitting", ("fitting_diameter", "connector_diameter", "connector_pitch"),
+               "the fitting's hexagon leaves too thin a wall around the connector thread",
+               lambda p: p.fitting_diameter*sqrt(3)/4 - MINIMUM_WALL
+               - p.connector_diameter/2 - max(p.connector_pitch/2, THREAD_INTERFERENCE)),
+    Constraint("outer_fitting", ("shaft_diameter", "tube_outer_diameter", "tube_outer_tolerance"),
+               "the tube path is wider than the shaft, so the shaft chamfer is negative",
+               _chamfer),
+    Constraint("outer_fitting", ("shaft_diameter", "tube_outer_diameter", "tube_outer_tolerance"),
+               "the upper shaft wall is too thin around the tube path",
+               lambda p: p.shaft_diameter/2 - 1 - _tube_radius(p) - MINIMUM_WALL),
+    Constraint("outer_fitting", ("shaft_length", "fitting_depth"),
+               "the shaft is shorter than the fitting",
+               lambda p: p.shaft_length - p.fitting_depth),
+    Constraint("shaft_thread", ("fitting_pitch",),
+               "the fitting thread needs a pitch", lambda p: p.fitting_pitch),
+    Constraint("shaft_thread", ("shaft_length", "fitting_depth", "shaft_diameter",
+                                "tube_outer_diameter", "tube_outer_tolerance"),
+               "the shaft leaves no length for its thread",
+               lambda p: p.shaft_length - p.fitting_depth - _chamfer(p)),
+    Constraint("shaft_thread", ("shaft_diameter", "fitting_pitch", "shaft_interference",
+                                "tube_outer_diameter", "tube_outer_tolerance"),
+               "the shaft thread cuts into the tube path",
+               lambda p: p.shaft_diameter/2 - p.fitting_pitch/2 - p.shaft_interference
+               - _tube_radius(p)),
+    Constraint("socket_base", ("hex_diameter", "shaft_diameter", "fitting_tolerance"),
+               "the socket's hexagon leaves too thin a wall around its thread",
+               lambda p: p.hex_diameter*sqrt(3)/4 - MINIMUM_WALL
+               - (p.shaft_diameter + p.fitting_tolerance)/2 - THREAD_INTERFERENCE),
+    Constraint("socket_base", ("shaft_length",),
+               "the socket needs a length", lambda p: p.shaft_length),
+    Constraint("bend", ("hex_diameter", "tube_outer_diameter", "tube_outer_tolerance"),
+               "the bend's hexagon leaves too thin a wall around the tube path",
+               lambda p: p.hex_diameter*sqrt(3)/4 - MINIMUM_WALL - _tube_radius(p)),
+    Constraint("bend", ("connector_diameter", "hex_diameter"),
+               "the bend radius is smaller than the hexagon, so the bend intersects itself",
+               lambda p: p.connector_diameter*2 - p.hex_diameter*sqrt(3)/4),
+    Constraint("bend", ("bend_angle",),
+               "the bend angle must be between 0 and 180 degrees",
+               lambda p: min(p.bend_angle, 180 - p.bend_angle), "°"),
+    Constraint("funnel", ("funnel_length",),
+               "the funnel needs a length", lambda p: p.funnel_length),
+    Constraint("funnel", ("shaft_diameter", "fitting_depth", "tube_inner_diameter",
+                          "tube_inner_tolerance"),
+               "the funnel's base leaves too thin a wall around the filament path",
+               lambda p: _funnel_radii(p)[0]*sqrt(3)/2 - MINIMUM_WALL
+               - (p.tube_inner_diameter + p.tube_inner_tolerance)/2),
+    Constraint("funnel", ("shaft_diameter", "fitting_depth", "funnel_top_scale",
+                          "tube_inner_diameter", "tube_inner_tolerance"),
+               "the funnel's rim wall leaves its mouth narrower than the filament path",
+               lambda p: _funnel_radii(p)[1]*sqrt(3)/2 - FUNNEL_RIM_WALL
+               - (p.tube_inner_diameter + p.tube_inner_tolerance)/2),
+    )
+
+
+def check(parameters, stages=None):
+    """
+    Checks parameters against every constraint, without building anything.
+
+    Args:
+        parameters (Parameters): The parameters to check.
+        stages (iterable): Only check the constraints of these stages; every
+            constraint if None.
+
+    Returns:
+        list: A Violation for each broken constraint, empty if the parameters
+        are valid.
+    """
+    violations = []
+    for constraint in CONSTRAINTS:
+        if stages is not None and constraint.stage not in stages:
+            continue
+        margin = constraint.margin(parameters)
+        if margin <= 0:
+            violations.append(Violation(
+                f"{constraint.message} ({-margin:.3g}{constraint.unit} short)" if margin
+                else constraint.message,
+                tuple(KEYS[name] for name in constraint.names)))
+    return violations
+
+
+def validate(parameters, stages=None):
+    """
+    Raises InvalidParameters if the parameters break any constraint.
+
+    Args:
+        parameters (Parameters): The parameters to check.
+        stages (iterable): Only check the constraints of these stages; every
+            constraint if None.
+    """
+    violations = check(parameters, stages)
+    if violations:
+        raise InvalidParameters(violations)
@@ -0,0 +1,51 @@
+"""Module providing the versions of the code and libraries the built geometry depends on."""
+import hashlib
+import os
+from functools import lru_cache
+from importlib import metadata
+
+LIBRARIES = ("build123d", "bd_warehouse", "cadquery-ocp")
+# other distributions of the same library, e.g. OCP built without VTK
+ALTERNATIVE_NAMES = {"cadquery-ocp": ("cadquery-ocp-novtk",)}
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# the modules whose code decides the shape of the built geometry: the parts,
+# the threads, funnels and labels they are made of, the fused solid, and the
+# serialization the geometry cache stores it with
+GEOMETRY_MODULES = ("external_fitting", "internal_funnel", "parametric_part", "threads",
+                    "funnels", "funnel_mesh", "labels", "fusion", "serialization")
+# the modules that turn the geometry into exported files
+EXPORT_MODULES = ("tessellation", "mesh_writers", "thread_mesh")
+
+
+@lru_cache(maxsize=None)
+def library_versions():
+    """Returns the installed versions of the CAD libraries the geometry depends on."""
+    versions = {}
+    for library in LIBRARIES:
+        versions[library] = None
+        for name in (library,) + ALTERNATIVE_NAMES.get(library, ()):
+            try:
+                versions[library] = metadata.version(name)
+                break
+            except metadata.PackageNotFoundError:
+                pass
+    return versions
+
+
+@lru_cache(maxsize=None)
+def source_digest(modules=GEOMETRY_MODULES, directory=SOURCE_DIRECTORY):
+    """
+    Returns a digest of the source of some modules, so that a change to the
+    code building the parts can be detected without importing it. Changes to
+    any other module, such as the command line tools, leave it unchanged.
+
+    Args:
+        modules (tuple): The names of the modules.
+        directory (str): The directory of the modules.
+    """
+    digest = hashlib.sha256()
+    for module in sorted(modules):
+        digest.update(module.encode())
+        with open(os.path.join(directory, f'{module}.py'), 'rb') as source_file:
+            digest.update(hashlib.sha256(source_file.read()).digest())
+    return digest.hexdigest()
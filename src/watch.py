@@ -0,0 +1,194 @@
+"""Watches the settings files and rebuilds only the parts whose settings changed."""
+import argparse
+import os
+import time
+import traceback
+from build import (SOURCE_DIRECTORY, DEFAULT_OUTPUT_DIRECTORY, find_configs, find_variants,
+                   part_class, export_part)
+from parameters import Parameters
+from validation import InvalidParameters
+
+DEFAULT_INTERVAL = 0.5
+
+
+def modification_times(directory):
+    """
+    Reads when each settings file in a directory last changed.
+
+    Args:
+        directory (str): The directory to search.
+
+    Returns:
+        dict: The modification time and size of each `*-settings.ini` file.
+    """
+    times = {}
+    for config_file in find_configs(directory):
+        try:
+            status = os.stat(config_file)
+        except FileNotFoundError:
+            continue
+        times[config_file] = (status.st_mtime_ns, status.st_size)
+    return times
+
+
+class Watcher:
+    """
+    Keeps a part for every variant in a settings directory. Parts are kept
+    between rebuilds, so a changed setting only rebuilds the stages that read it.
+    """
+    def __init__(self, directory, output_directory, formats=('stl',), preview=True,
+                 adaptive=False, mesh_threads=False):
+        """
+        Initialize the watcher; nothing is built until update() is called.
+
+        Args:
+            directory (str): The directory containing the settings files.
+            output_directory (str): The directory the exports are written to.
+            formats (tuple): Any of 'stl', '3mf' and 'step'.
+            preview (bool): Send the rebuilt parts to the OCP CAD Viewer.
+            adaptive (bool): Mesh STL and 3MF exports with per-feature tolerances.
+            mesh_threads (bool): Generate the threads of STL exports from their profile.
+        """
+        self.directory = directory
+        self.output_directory = output_directory
+        self.formats = formats
+        self.preview = preview
+        self.adaptive = adaptive
+        self.mesh_threads = mesh_threads
+        self.parts = {}
+        self.times = {}
+
+    def changed_files(self):
+        """
+        Get the settings files that were added or modified since the last call.
+
+        Returns:
+            list: Their paths.
+        """
+        times = modification_times(self.directory)
+        changed = [config_file for config_file, stamp in times.items()
+                   if self.times.get(config_file) != stamp]
+        self.times = times
+        return changed
+
+    def readable_files(self, changed):
+        """
+        Get the settings files that parse, reporting the changed ones that
+        don't. A file that fails is skipped until it changes again.
+
+        Args:
+            changed (list): The files changed since the last update.
+
+        Returns:
+            list: The sorted paths of the files that parse.
+        """
+        readable = []
+        for config_file in sorted(self.times):
+            try:
+                Parameters.from_file(config_file)
+            except Exception as error:  # keep watching after a bad edit
+                if config_file in changed:
+                    print(f'{os.path.basename(config_file)}: {error}, '
+                          'waiting for the next change')
+                continue
+            readable.append(config_file)
+        return readable
+
+    def update(self):
+        """
+        Rebuild and export the variants whose settings file changed, and drop
+        the parts of variants that no longer exist.
+
+        Returns:
+            list: The names of the variants rebuilt.
+        """
+        changed = self.changed_files()
+        variants = find_variants(self.readable_files(changed))
+        names = {variant.name for variant in variants}
+        for name in [name for name in self.parts if name not in names]:
+            del self.parts[name]
+        rebuilt = []
+        for variant in variants:
+            if variant.config_file not in changed and variant.name in self.parts:
+                continue
+            start = time.perf_counter()
+            try:
+                parameters = Parameters.from_file(variant.config_file)
+                part = self.parts.get(variant.name)
+                if part is None:
+                    part = self.parts[variant.name] = part_class(variant.part)(
+                        parameters=parameters)
+                elif part.parameters == parameters:
+                    continue
+                else:
+                    part.parameters = parameters
+                outputs, _ = export_part(part, variant.name, self.output_directory,
+                                         self.formats, self.adaptive, self.mesh_threads)
+            except InvalidParameters as error:
+                for violation in error.violations:
+                    print(f'{variant.name}: {violation.message} [{", ".join(violation.keys)}]')
+                continue
+            except Exception:  # keep watching after a bad edit
+                traceback.print_exc()
+                print(f'{variant.name}: failed, waiting for the next change')
+                continue
+            print(f'{variant.name}: {time.perf_counter() - start:.1f}s -> {", ".join(outputs)}')
+            rebuilt.append(variant.name)
+        if rebuilt and self.preview:
+            self.show(rebuilt)
+        return rebuilt
+
+    def show(self, names):
+        """
+        Shows parts in the OCP CAD Viewer.
+
+        Args:
+            names (list): The names of the variants to show.
+        """
+        # imported here so watching without a viewer doesn't need it
+        from ocp_vscode import show
+        show(*(self.parts[name].compound for name in names), names=names)
+
+    def watch(self, interval=DEFAULT_INTERVAL):
+        """
+        Builds every variant, then rebuilds variants as their settings change,
+        until interrupted.
+
+        Args:
+            interval (float): Seconds between checks for changes.
+        """
+        os.makedirs(self.output_directory, exist_ok=True)
+        self.update()
+        print(f'watching {self.directory} for changes, press Ctrl+C to stop')
+        try:
+            while True:
+                time.sleep(interval)
+                self.update()
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('config_directory', nargs='?', default=SOURCE_DIRECTORY,
+                        help='directory containing the *-settings.ini files')
+    parser.add_argument('-o', '--output-directory', default=DEFAULT_OUTPUT_DIRECTORY)
+    parser.add_argument('-f', '--format', dest='formats', action='append',
+                        choices=('stl', '3mf', 'step'),
+                        help='export format, may be repeated (default: stl)')
+    parser.add_argument('--no-show', dest='preview', action='store_false',
+                        help="don't send rebuilt parts to the OCP CAD Viewer")
+    parser.add_argument('--adaptive', action='store_true',
+                        help='mesh STL and 3MF exports with per-feature tolerances')
+    parser.add_argument('--mesh-threads', action='store_true',
+                        help='generate STL thread triangles directly from the thread profile')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'seconds between checks for changes (default: {DEFAULT_INTERVAL})')
+    args = parser.parse_args()
+    Watcher(args.config_directory, args.output_directory, tuple(args.formats or ('stl',)),
+            args.preview, args.adaptive, args.mesh_threads).watch(args.interval)
+
+
+if __name__ == '__main__':
+    main()
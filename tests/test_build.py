@@ -0,0 +1,80 @@
+"""Checks how settings files are turned into variants and exported."""
+import pytest
+from build import EXTERNAL_FITTING, export_part, find_variants
+from parameters import Parameters
+
+
+def _settings(directory, stem, **changes):
+    """Writes a settings file with some parameters changed from the defaults."""
+    path = directory / f"{stem}-settings.ini"
+    with open(path, "w", encoding="utf-8") as settings_file:
+        Parameters().replace(**changes).to_config().write(settings_file)
+    return str(path)
+
+
+def _fittings(config_files):
+    return {variant.name: variant.config_file for variant in find_variants(config_files)
+            if variant.part == EXTERNAL_FITTING}
+
+
+def test_fittings_are_shared_by_settings_they_dont_read(tmp_path):
+    first = _settings(tmp_path, "a", tube_inner_diameter=2)
+    second = _settings(tmp_path, "b", tube_inner_diameter=2.5, funnel_length=30)
+    assert _fittings([first, second]) == {"6mmOD-external-fitting": first}
+
+
+def test_fittings_differing_in_what_they_read_are_built_separately(tmp_path):
+    first = _settings(tmp_path, "a")
+    second = _settings(tmp_path, "b", tube_outer_tolerance=0.3)
+    third = _settings(tmp_path, "c", connector_pitch=1)
+    assert _fittings([first, second, third]) == {"6mmOD-a-external-fitting": first,
+                                                 "6mmOD-b-external-fitting": second,
+                                                 "6mmOD-c-external-fitting": third}
+
+
+def test_fittings_are_named_by_their_exact_diameter(tmp_path):
+    first = _settings(tmp_path, "a", tube_outer_diameter=4.4)
+    second = _settings(tmp_path, "b", tube_outer_diameter=4.6)
+    assert _fittings([first, second]) == {"4.4mmOD-external-fitting": first,
+                                          "4.6mmOD-external-fitting": second}
+
+
+class _Part:
+    """Stands in for a built part, writing nothing and counting a fixed mesh."""
+    def export_stl(self, file_path, **options):
+        return 10 if options["mesh_threads"] else 12
+
+    def export_3mf(self, file_path, **options):
+        return 14
+
+    def export_step(self, file_path, **options):
+        pass
+
+
+def test_each_export_reports_its_own_triangles(tmp_path):
+    outputs, triangles = export_part(_Part(), "part", str(tmp_path), ("stl", "step", "3mf"),
+                                     mesh_threads=True)
+    assert [path[-4:] for path in outputs] == [".stl", "step", ".3mf"]
+    assert triangles == [10, None, 14]
+
+
+def test_pipelined_builds_with_one_job_run_in_this_process(tmp_path, monkeypatch):
+    import build
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a single job shouldn't start worker processes")
+
+    def build_variant(variant, *args):
+        return variant, [], 0.0, []
+
+    monkeypatch.setattr(build, "ProcessPoolExecutor", no_pool)
+    monkeypatch.setattr(build, "build_variant", build_variant)
+    variants = find_variants([_settings(tmp_path, "a")])
+    results = list(build.build_pipelined(variants, str(tmp_path), jobs=1))
+    assert [result[0] for result in results] == variants
+
+
+def test_thread_meshes_leave_the_threads_out_of_built_objects():
+    pytest.importorskip("build123d")
+    from external_fitting import ExternalFitting
+    assert set(ExternalFitting().dump_objects(mesh_threads=True)) == {"outer_fitting"}
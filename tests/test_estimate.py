@@ -0,0 +1,40 @@
+"""Checks the closed-form volumes the estimates are built from."""
+import glob
+import os
+import pytest
+from estimate import PrintSettings, hexagon_area, print_estimate, Component, thread_volume
+from funnel_mesh import mesh_volume
+from thread_mesh import thread_mesh
+from threads import ThreadSpec
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+CONFIG_FILES = sorted(glob.glob(os.path.join(SOURCE_DIRECTORY, "*-settings.ini")))
+
+
+@pytest.mark.parametrize("finishes", [None, ("square", "chamfer"), ("square", "square"),
+                                      ("raw", "fade"), ("chamfer", "chamfer")])
+@pytest.mark.parametrize("external", [True, False])
+def test_thread_volume_matches_the_mesh(finishes, external):
+    spec = ThreadSpec(diameter=12, pitch=1.25, length=10, external=external,
+                      end_finishes=finishes)
+    assert thread_volume(spec) == pytest.approx(mesh_volume(thread_mesh(spec)), rel=0.02)
+
+
+@pytest.mark.parametrize("config_file", CONFIG_FILES)
+def test_part_thread_volumes_match_their_meshes(config_file):
+    pytest.importorskip("build123d")
+    from external_fitting import ExternalFitting
+    from internal_funnel import InternalFunnel
+    for part in (ExternalFitting(config_file), InternalFunnel(config_file)):
+        for spec, _ in part._thread_placements().values():
+            assert thread_volume(spec) == pytest.approx(mesh_volume(thread_mesh(spec)), rel=0.02)
+
+
+def test_solid_walls_print_without_infill():
+    settings = PrintSettings(infill=0)
+    thin = Component(hexagon_area(5)*10, 2*settings.perimeters*settings.line_width)
+    estimate = print_estimate({"wall": thin}, 10, settings)
+    assert estimate.filament == pytest.approx(estimate.volume)
+    thick = thin._replace(wall=4*thin.wall)
+    assert print_estimate({"wall": thick}, 10, settings).filament == pytest.approx(
+        estimate.volume/4)
@@ -0,0 +1,21 @@
+"""Checks that fusing a part's objects gives one solid or fails loudly."""
+import pytest
+
+build123d = pytest.importorskip("build123d")
+from fusion import fuse  # pylint: disable=wrong-import-position
+
+
+def test_overlapping_shapes_fuse_into_one_solid():
+    body = build123d.Box(2, 2, 2)
+    thread = build123d.Cylinder(0.5, 4)
+    fused = fuse([body, thread], "part")
+    assert fused.label == "part"
+    assert len(fused.solids()) == 1
+    assert fused.volume > body.volume
+
+
+def test_separate_shapes_are_rejected():
+    body = build123d.Box(2, 2, 2)
+    thread = build123d.Cylinder(0.5, 1).moved(build123d.Location((5, 0, 0)))
+    with pytest.raises(ValueError, match="part gave 2 solids"):
+        fuse([body, thread], "part")
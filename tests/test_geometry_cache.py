@@ -0,0 +1,39 @@
+"""Checks what invalidates cached geometry and how damaged entries are handled."""
+import os
+import pytest
+from versions import GEOMETRY_MODULES, source_digest
+
+
+def _write_modules(directory, names, text):
+    for name in names:
+        (directory / f"{name}.py").write_text(text)
+    # the digest is read once per process
+    source_digest.cache_clear()
+
+
+def test_only_geometry_modules_change_the_digest(tmp_path):
+    _write_modules(tmp_path, GEOMETRY_MODULES + ("benchmark", "build"), "x = 1\n")
+    digest = source_digest(directory=str(tmp_path))
+    _write_modules(tmp_path, ("benchmark", "build"), "x = 2\n")
+    assert source_digest(directory=str(tmp_path)) == digest
+    _write_modules(tmp_path, ("threads",), "x = 2\n")
+    assert source_digest(directory=str(tmp_path)) != digest
+
+
+def test_truncated_entries_are_built_again(tmp_path, monkeypatch):
+    build123d = pytest.importorskip("build123d")
+    import geometry_cache
+    monkeypatch.setattr(geometry_cache, "cache_directory", str(tmp_path))
+    monkeypatch.setattr(geometry_cache, "enabled", True)
+    builds = []
+
+    def box(size):
+        builds.append(size)
+        return build123d.Box(size, size, size)
+
+    geometry_cache.cached_shape("box", box, size=2)
+    directory = tmp_path / "box"
+    path = directory / os.listdir(directory)[0]
+    path.write_bytes(path.read_bytes()[:5])
+    assert geometry_cache.cached_shape("box", box, size=2).volume == pytest.approx(8)
+    assert builds == [2, 2]
@@ -0,0 +1,56 @@
+"""Checks when the manifest lets an export be skipped."""
+import os
+from build import INTERNAL_FUNNEL, Variant, output_inputs
+from manifest import Manifest, input_digest
+from parameters import Parameters
+
+
+def _export(directory, inputs):
+    """Writes and records an export, as build_variant does."""
+    path = os.path.join(directory, "part.stl")
+    with open(path, "wb") as export_file:
+        export_file.write(b"solid")
+    manifest = Manifest.load(directory)
+    manifest.record(path, inputs, Parameters(), triangles=1, seconds=0.1)
+    manifest.save()
+    return path
+
+
+def test_unchanged_export_is_current(tmp_path):
+    inputs = input_digest(INTERNAL_FUNNEL, Parameters(), "stl", {})
+    path = _export(tmp_path, inputs)
+    assert Manifest.load(tmp_path).is_current(path, inputs)
+
+
+def test_changed_inputs_rebuild(tmp_path):
+    path = _export(tmp_path, input_digest(INTERNAL_FUNNEL, Parameters(), "stl", {}))
+    manifest = Manifest.load(tmp_path)
+    for inputs in (input_digest(INTERNAL_FUNNEL, Parameters().replace(funnel_length=20),
+                                "stl", {}),
+                   input_digest(INTERNAL_FUNNEL, Parameters(), "3mf", {}),
+                   input_digest(INTERNAL_FUNNEL, Parameters(), "stl", {"adaptive": True})):
+        assert not manifest.is_current(path, inputs)
+
+
+def test_edited_or_missing_export_rebuilds(tmp_path):
+    inputs = input_digest(INTERNAL_FUNNEL, Parameters(), "stl", {})
+    path = _export(tmp_path, inputs)
+    with open(path, "ab") as export_file:
+        export_file.write(b"!")
+    assert not Manifest.load(tmp_path).is_current(path, inputs)
+    os.remove(path)
+    assert not Manifest.load(tmp_path).is_current(path, inputs)
+
+
+def test_unreadable_manifest_is_empty(tmp_path):
+    (tmp_path / "manifest.json").write_text("{")
+    assert Manifest.load(tmp_path).entries == {}
+
+
+def test_output_inputs_follow_parameters(tmp_path):
+    variant = Variant(INTERNAL_FUNNEL, None, "funnel", Parameters())
+    changed = variant._replace(parameters=Parameters().replace(bend_angle=60))
+    [(path, inputs)] = output_inputs(variant, tmp_path, ("stl",), {})
+    assert path == os.path.join(tmp_path, "funnel.stl")
+    assert output_inputs(changed, tmp_path, ("stl",), {})[0][1] != inputs
+
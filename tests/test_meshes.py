@@ -0,0 +1,105 @@
+"""Checks the funnel and thread meshes, which are generated without the CAD kernel."""
+import numpy as np
+import pytest
+from estimate import thread_volume
+from funnel_mesh import cone_funnel_mesh, hex_funnel_mesh, mesh_volume, stl_facets
+from thread_mesh import thread_mesh, volume_error
+from threads import ThreadSpec
+
+THREADS = {
+    "connector": ThreadSpec(diameter=10.1, pitch=0.874, length=6.063, external=False),
+    "shaft": ThreadSpec(diameter=12, pitch=1.25, length=10, external=True, interference=0.3,
+                        end_finishes=("square", "chamfer")),
+    "socket": ThreadSpec(diameter=12.5, pitch=1.25, length=15, external=False,
+                         end_finishes=("square", "square")),
+    "raw": ThreadSpec(diameter=8, pitch=1, length=5, external=True, end_finishes=("raw", "fade")),
+    }
+FUNNELS = {
+    "hex": hex_funnel_mesh(),
+    "hex rim": hex_funnel_mesh(minimum_wall=2),
+    "cone": cone_funnel_mesh(),
+    "cone rim": cone_funnel_mesh(minimum_wall=2),
+    }
+
+
+def assert_watertight(mesh):
+    """Every edge is shared by exactly two triangles, wound in opposite directions."""
+    triangles = mesh.triangles
+    edges = np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]))
+    directed = {tuple(edge) for edge in edges}
+    assert len(directed) == len(edges), "an edge is used twice in the same direction"
+    assert all((second, first) in directed for first, second in directed), "the mesh has holes"
+    assert mesh_volume(mesh) > 0, "the mesh is wound inward"
+
+
+@pytest.mark.parametrize("name", FUNNELS)
+def test_funnel_mesh_is_watertight(name):
+    assert_watertight(FUNNELS[name])
+
+
+@pytest.mark.parametrize("name", THREADS)
+def test_thread_mesh_is_watertight(name):
+    assert_watertight(thread_mesh(THREADS[name]))
+
+
+@pytest.mark.parametrize("name", ["connector", "shaft", "socket"])
+def test_thread_mesh_starts_at_zero(name):
+    spec = THREADS[name]
+    z = thread_mesh(spec).vertices[:, 2]
+    assert z.min() >= -1e-9
+    assert z.max() <= spec.length + 1e-9
+
+
+def test_square_thread_mesh_matches_closed_form_volume():
+    spec = THREADS["socket"]
+    assert mesh_volume(thread_mesh(spec)) == pytest.approx(thread_volume(spec), rel=0.02)
+
+
+def test_stl_facets_follow_the_winding():
+    mesh = FUNNELS["hex"]
+    facets = stl_facets(mesh)
+    corners = mesh.vertices[mesh.triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    # degenerate triangles get a zero normal
+    normals /= np.where(lengths > 0, lengths, 1)[:, None]
+    assert np.allclose(facets["vertices"], corners, atol=1e-4)
+    assert np.allclose(facets["normal"], normals, atol=1e-5)
+
+
+def test_faded_thread_mesh_matches_brep():
+    pytest.importorskip("build123d")
+    pytest.importorskip("bd_warehouse")
+    assert abs(volume_error(THREADS["connector"])) < 0.02
+
+
+@pytest.mark.parametrize("name", ["connector", "shaft", "socket"])
+def test_brep_thread_spans_the_mesh(name):
+    pytest.importorskip("build123d")
+    pytest.importorskip("bd_warehouse")
+    from threads import thread_proxy, trapezoidal_thread
+    spec = THREADS[name]
+    z = thread_mesh(spec).vertices[:, 2]
+    box = trapezoidal_thread(spec).bounding_box(optimal=True)
+    assert box.min.Z == pytest.approx(z.min(), abs=spec.pitch/4)
+    assert box.max.Z == pytest.approx(z.max(), abs=spec.pitch/4)
+    proxy = thread_proxy(spec).bounding_box()
+    assert (proxy.min.Z, proxy.max.Z) == pytest.approx((0, spec.length))
+
+
+def test_squared_thread_mesh_matches_clipped_brep():
+    """
+    Square ends are the raw thread clipped at z=0 and z=length. bd_warehouse
+    0.4 drops the top loop when both ends are finished, so the mesh is checked
+    against the clipped raw thread rather than its squared one.
+    """
+    build123d = pytest.importorskip("build123d")
+    pytest.importorskip("bd_warehouse")
+    from threads import trapezoidal_thread
+    spec = THREADS["socket"]
+    raw = trapezoidal_thread(spec._replace(end_finishes=("raw", "raw")))
+    slab = build123d.Box(2*spec.diameter, 2*spec.diameter, spec.length,
+                         align=(build123d.Align.CENTER, build123d.Align.CENTER,
+                                build123d.Align.MIN))
+    expected = (raw & slab).volume
+    assert mesh_volume(thread_mesh(spec)) == pytest.approx(expected, rel=0.01)
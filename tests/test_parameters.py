@@ -0,0 +1,49 @@
+"""Checks parsing, coercion and pickling of the part parameters."""
+import pickle
+from configparser import ConfigParser
+import pytest
+from parameters import KEYS, Parameters, coerce
+
+
+def test_from_config_reads_set_options_over_the_base():
+    config = ConfigParser()
+    config.read_string("[tube]\ninner_diameter = 2.5\n[general]\nfont-path = font.ttf\n")
+    base = Parameters().replace(funnel_length=40)
+    parameters = Parameters.from_config(config, base)
+    assert parameters.tube_inner_diameter == 2.5
+    assert parameters.font_path == "font.ttf"
+    assert parameters.funnel_length == 40
+    assert parameters.changed(base) == ["tube_inner_diameter", "font_path"]
+
+
+def test_to_config_round_trips():
+    parameters = Parameters().replace(bend_angle=60, font_path="font.ttf")
+    assert Parameters.from_config(parameters.to_config()) == parameters
+
+
+def test_replace_coerces_numbers():
+    parameters = Parameters().replace(shaft_length="21", fitting_pitch=1)
+    assert parameters.shaft_length == 21.0 and isinstance(parameters.fitting_pitch, float)
+    assert coerce("font_path", 3) == "3"
+
+
+@pytest.mark.parametrize("changes", [{"shaft_length": -1}, {"shaft_length": "nan"}])
+def test_negative_or_missing_numbers_are_rejected(changes):
+    with pytest.raises(ValueError):
+        Parameters().replace(**changes)
+
+
+def test_unknown_parameter():
+    with pytest.raises(AttributeError):
+        Parameters().replace(nut_size=3)
+
+
+def test_keys_name_the_ini_options():
+    assert KEYS["tube_outer_tolerance"] == "tube.outer_tolerance"
+    assert Parameters.key("font_path") == "general.font-path"
+
+
+def test_parameters_hash_and_pickle():
+    parameters = Parameters().replace(tube_inner_diameter=2.5)
+    assert pickle.loads(pickle.dumps(parameters)) == parameters
+    assert len({parameters, Parameters().replace(tube_inner_diameter=2.5)}) == 1
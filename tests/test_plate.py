@@ -0,0 +1,27 @@
+"""Checks the shelf packing of parts on a build plate."""
+import pytest
+from plate import pack
+
+
+def test_packed_rectangles_stay_on_the_bed_without_overlapping():
+    footprints = [(30, 20), (50, 40), (25, 25), (60, 10), (40, 40), (35, 30)]
+    positions = pack(footprints, bed=(120, 120), spacing=5)
+    boxes = [(x, y, x + width, y + depth)
+             for (x, y), (width, depth) in zip(positions, footprints)]
+    for left, front, right, back in boxes:
+        assert left >= 5 and front >= 5 and right <= 115 and back <= 115
+    for index, first in enumerate(boxes):
+        for second in boxes[index + 1:]:
+            assert (first[2] + 5 <= second[0] or second[2] + 5 <= first[0]
+                    or first[3] + 5 <= second[1] or second[3] + 5 <= first[1])
+
+
+def test_deepest_part_starts_the_first_shelf():
+    positions = pack([(10, 10), (10, 30)], bed=(100, 100), spacing=5)
+    assert positions[1] == (5, 5)
+    assert positions[0] == (20, 5)
+
+
+def test_parts_that_dont_fit():
+    with pytest.raises(ValueError):
+        pack([(80, 80), (80, 80)], bed=(100, 100), spacing=5)
@@ -0,0 +1,37 @@
+"""Checks that serialized shapes come back with their labels and locations."""
+import pytest
+
+build123d = pytest.importorskip("build123d")
+from serialization import dumps, loads  # pylint: disable=wrong-import-position
+
+
+def test_round_trip_keeps_the_label_hierarchy():
+    box = build123d.Box(1, 2, 3)
+    box.label = "box"
+    cylinder = build123d.Cylinder(1, 2).moved(build123d.Location((5, 0, 0)))
+    cylinder.label = "cylinder"
+    part = build123d.Compound(label="part", children=[box, cylinder])
+    restored = loads(dumps(part))
+    assert restored.label == "part"
+    assert [child.label for child in restored.children] == ["box", "cylinder"]
+    assert restored.volume == pytest.approx(part.volume)
+    assert restored.children[1].center().X == pytest.approx(5)
+
+
+def test_unknown_format_is_rejected():
+    data = bytearray(dumps(build123d.Box(1, 1, 1)))
+    data[3] += 1
+    with pytest.raises(ValueError):
+        loads(bytes(data))
+
+
+def test_subclasses_restore_as_their_build123d_base():
+    class Bracket(build123d.Part):
+        """A part class of another library, like bd_warehouse's threads."""
+
+    bracket = Bracket(build123d.Box(1, 2, 3).wrapped)
+    bracket.label = "bracket"
+    restored = loads(dumps(bracket))
+    assert type(restored) is build123d.Part
+    assert restored.label == "bracket"
+    assert restored.volume == pytest.approx(6)
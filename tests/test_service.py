@@ -0,0 +1,30 @@
+"""Checks the build service's cache of recent exports."""
+from service import ResultCache
+
+
+def test_least_recently_used_exports_are_evicted():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.size == 8
+
+
+def test_replacing_an_export_counts_its_size_once():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("a", b"aaaaaa")
+    assert len(cache) == 1
+    assert cache.size == 6
+
+
+def test_exports_larger_than_the_cache_are_not_kept():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("big", b"x"*11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"aaaa"
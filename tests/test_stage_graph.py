@@ -0,0 +1,51 @@
+"""Checks which stages a change invalidates."""
+import pytest
+from part_stages import INTERNAL_FUNNEL_STAGES, PART_STAGES
+from stage_graph import StageCache
+
+
+def test_config_key_invalidates_readers_and_dependents():
+    assert INTERNAL_FUNNEL_STAGES.affected("funnel.length") == {
+        "funnel", "body", "compound", "fused"}
+    assert INTERNAL_FUNNEL_STAGES.affected("fitting.pitch") == {"thread", "compound", "fused"}
+
+
+def test_inputs_follow_stages_to_config_keys():
+    inputs = INTERNAL_FUNNEL_STAGES.inputs("body")
+    assert {"bend.angle", "funnel.length", "fitting.hex_diameter"} <= inputs
+    assert "fitting.pitch" not in inputs
+    assert "fitting.pitch" in INTERNAL_FUNNEL_STAGES.inputs("compound")
+
+
+def test_every_part_builds_a_compound_and_a_fused_solid():
+    for stages in PART_STAGES.values():
+        assert {"compound", "fused"} <= set(stages.stages)
+
+
+def test_cache_rebuilds_only_invalidated_stages():
+    cache = StageCache(INTERNAL_FUNNEL_STAGES)
+    built = []
+
+    def build(stage):
+        built.append(stage)
+        return stage
+
+    for stage in ("socket_base", "bend", "funnel", "thread", "body"):
+        cache.get(stage, lambda stage=stage: build(stage))
+    cache.invalidate("funnel.length")
+    for stage in ("socket_base", "bend", "funnel", "thread", "body"):
+        cache.get(stage, lambda stage=stage: build(stage))
+    assert built[5:] == ["funnel", "body"]
+
+
+def test_put_discards_dependents():
+    cache = StageCache(INTERNAL_FUNNEL_STAGES)
+    cache.get("body", lambda: "old body")
+    cache.put("bend", "new bend")
+    assert cache.get("bend", lambda: pytest.fail("bend was rebuilt")) == "new bend"
+    assert cache.get("body", lambda: "new body") == "new body"
+
+
+def test_unknown_stage():
+    with pytest.raises(KeyError):
+        StageCache(INTERNAL_FUNNEL_STAGES).get("nut", lambda: None)
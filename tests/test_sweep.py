@@ -0,0 +1,45 @@
+"""Checks how sweeps are parsed and expanded into variants."""
+import os
+import pytest
+from build import EXTERNAL_FITTING, INTERNAL_FUNNEL
+from sweep import expand, parse_axis, sweep_variants
+from parameters import Parameters
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src",
+                           "3mmIDx6mmOD-settings.ini")
+
+
+def test_range_axis_includes_both_ends():
+    assert parse_axis("fitting.tolerance=0.3:0.7:5") == (
+        "fitting_tolerance", [0.3, 0.4, 0.5, 0.6, 0.7])
+    assert parse_axis("bend_angle=45:90:1") == ("bend_angle", [45.0])
+
+
+def test_list_axis_accepts_names_and_keys():
+    assert parse_axis("shaft_interference=0.2, 0.4") == ("shaft_interference", [0.2, 0.4])
+    assert parse_axis("shaft.interference=0.2") == ("shaft_interference", [0.2])
+
+
+@pytest.mark.parametrize("text", ["nut.size=1,2", "bend_angle=1:2:0"])
+def test_bad_axes(text):
+    with pytest.raises(ValueError):
+        parse_axis(text)
+
+
+def test_expand_makes_every_combination():
+    grid = expand(Parameters(), [("bend_angle", [45.0, 90.0]), ("funnel_length", [20.0, 30.0])])
+    assert [point for point, _ in grid] == [
+        {"bend_angle": 45.0, "funnel_length": 20.0}, {"bend_angle": 45.0, "funnel_length": 30.0},
+        {"bend_angle": 90.0, "funnel_length": 20.0}, {"bend_angle": 90.0, "funnel_length": 30.0}]
+    assert grid[3][1].bend_angle == 90.0 and grid[3][1].funnel_length == 30.0
+
+
+def test_parts_are_built_once_per_value_they_read():
+    variants = sweep_variants(CONFIG_FILE, [parse_axis("bend.angle=45,60,90"),
+                                            parse_axis("connector.pitch=0.8,0.9")])
+    fittings = [variant for variant in variants if variant.part == EXTERNAL_FITTING]
+    funnels = [variant for variant in variants if variant.part == INTERNAL_FUNNEL]
+    # the fitting doesn't read the bend angle, the funnel doesn't read the connector
+    assert len(fittings) == 2 and len(funnels) == 3
+    assert all("bend_angle" not in variant.name for variant in fittings)
+    assert len({variant.name for variant in variants}) == len(variants)
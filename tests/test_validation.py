@@ -0,0 +1,43 @@
+"""Checks the constraints parameters are validated against before building."""
+import glob
+import os
+import pytest
+from parameters import Parameters
+from part_stages import PART_STAGES
+from validation import CONSTRAINTS, InvalidParameters, check, validate
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+@pytest.mark.parametrize("config_file",
+                         sorted(glob.glob(os.path.join(SOURCE_DIRECTORY, "*-settings.ini"))))
+def test_shipped_settings_are_valid(config_file):
+    assert check(Parameters.from_file(config_file)) == []
+
+
+def test_every_constraint_belongs_to_a_stage():
+    stages = set().union(*(graph.stages for graph in PART_STAGES.values()))
+    assert {constraint.stage for constraint in CONSTRAINTS} <= stages
+
+
+def test_violation_names_the_keys():
+    violations = check(Parameters().replace(bend_angle=190))
+    assert [violation.keys for violation in violations] == [("bend.angle",)]
+    assert "between 0 and 180" in violations[0].message
+
+
+def test_violations_are_measured_in_the_constraints_unit():
+    assert check(Parameters().replace(bend_angle=190))[0].message.endswith("(10° short)")
+    assert check(Parameters().replace(shaft_length=4))[0].message.endswith("(0.5mm short)")
+
+
+def test_only_the_given_stages_are_checked():
+    parameters = Parameters().replace(tube_outer_diameter=12)
+    assert check(parameters, PART_STAGES["external-fitting"].stages)
+    assert check(parameters, PART_STAGES["internal-funnel"].stages) == []
+
+
+def test_validate_raises():
+    with pytest.raises(InvalidParameters) as error:
+        validate(Parameters().replace(funnel_length=0))
+    assert error.value.violations[0].keys == ("funnel.length",)